@@ -0,0 +1,10 @@
+import glob
+import os
+
+from hypnokit.benchmark import main
+
+
+if __name__ == '__main__':
+    root = os.path.dirname(os.path.abspath(__file__))
+    dir = os.path.join(root, 'benchmarks')
+    main(default_scripts=sorted(glob.glob(os.path.join(dir, '*.yaml'))))
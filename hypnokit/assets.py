@@ -0,0 +1,133 @@
+from collections import OrderedDict
+import threading
+
+import pygame
+
+from typing import Callable, Iterator, NamedTuple, Optional
+from .images import Images
+from .types import Size
+
+
+class Assets(NamedTuple):
+    images: Images
+    spiral: Iterator[pygame.Surface]
+
+    @property
+    def nbytes(self) -> int:
+        return self.images.nbytes + self.spiral.nbytes
+
+    @property
+    def ready(self) -> bool:
+        return self.images.ready and self.spiral.ready
+
+    def close(self) -> None:
+        self.images.close()
+
+
+class AssetCache:
+    evictions: int = 0
+
+    __assets: OrderedDict[Size, Assets]
+    __load: Callable[[Size], Assets]
+
+    def __init__(self, load: Callable[[Size], Assets], **kwargs):
+        self.__load = load
+        self.__assets = OrderedDict()
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+        # other sizes are loaded on a startup thread while the session runs
+        self.__lock = threading.RLock()
+
+    def __contains__(self, size: Size) -> bool:
+        with self.__lock:
+            return size in self.__assets
+
+    def __iter__(self) -> Iterator[Assets]:
+        with self.__lock:
+            return iter(list(self.__assets.values()))
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__assets)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(assets.nbytes for assets in self)
+
+    def get(self, size: Size) -> Assets:
+        with self.__lock:
+            assets = self.__assets.get(size)
+            if assets is not None:
+                self.__assets.move_to_end(size)
+                return assets
+        return self.__add(size, self.__load(size), recent=True)
+
+    def peek(self, size: Size) -> Optional[Assets]:
+        # neither loads nor counts as a use
+        with self.__lock:
+            return self.__assets.get(size)
+
+    def prefetch(self, size: Size) -> Assets:
+        # loads without counting as a use, so it's the first to be evicted
+        with self.__lock:
+            assets = self.__assets.get(size)
+            if assets is not None:
+                return assets
+        return self.__add(size, self.__load(size), recent=False)
+
+    def nearest(self, size: Size) -> tuple[Size, Assets]:
+        # stand in with the closest finished size until this one is built
+        with self.__lock:
+            assets = self.__assets.get(size)
+            if assets is not None and assets.ready:
+                self.__assets.move_to_end(size)
+                return size, assets
+            ready = [
+                key for key, other in self.__assets.items() if other.ready
+            ]
+            if ready:
+                key = min(
+                    ready,
+                    key=lambda k: abs(k.x - size.x) + abs(k.y - size.y),
+                )
+                self.__assets.move_to_end(key)
+                return key, self.__assets[key]
+        return size, self.get(size)
+
+    def evict(self, nbytes: int, *keep: Size) -> int:
+        # least recently used sizes first, returning how much was freed
+        freed = 0
+        with self.__lock:
+            for size in list(self.__assets):
+                if freed >= nbytes:
+                    break
+                if size in keep:
+                    continue
+                assets = self.__assets.pop(size)
+                freed += assets.nbytes
+                assets.close()
+                self.evictions += 1
+        return freed
+
+    def replace(self, update: Callable[[Size, Assets], Assets]) -> None:
+        # oldest first, so the size in use is rebuilt last and goes first
+        with self.__lock:
+            for size, assets in list(self.__assets.items()):
+                self.__assets[size] = update(size, assets)
+
+    def clear(self) -> None:
+        with self.__lock:
+            for assets in self.__assets.values():
+                assets.close()
+            self.__assets.clear()
+
+    def __add(self, size: Size, assets: Assets, recent: bool) -> Assets:
+        # loading happens outside the lock, so another thread may have
+        # got there first
+        with self.__lock:
+            existing = self.__assets.setdefault(size, assets)
+            if existing is assets or recent:
+                self.__assets.move_to_end(size, last=recent)
+        if existing is not assets:
+            assets.close()
+        return existing
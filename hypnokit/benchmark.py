@@ -0,0 +1,246 @@
+import argparse
+import concurrent.futures
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame  # noqa: E402
+
+from .images import Images  # noqa: E402
+from .screen import SPIRAL_MODES, Screen  # noqa: E402
+from .script import Script  # noqa: E402
+from .types import Size  # noqa: E402
+
+from typing import Any, Callable, Optional  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+SIZES = (Size(800, 600), Size(1920, 1080))
+
+
+def peak_rss() -> Optional[float]:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes everywhere else
+    return rss / 2**20 if sys.platform == 'darwin' else rss / 2**10
+
+
+def screen_case(
+    path: str,
+    size: Size,
+    frames: int,
+    images: str,
+    frames_per_second: int = 60,
+) -> dict[str, Any]:
+    script = Script.load(path)
+    script.options['screen'] = {
+        **(script.options.get('screen') or {}),
+        'frames_per_second': frames_per_second,
+        'fullscreen': False,
+        'size': list(size),
+    }
+    # script time steps a frame period per frame, so the actions and the
+    # spiral run as they would live, without waiting between frames
+    script.options['ticker'] = {
+        **(script.options.get('ticker') or {}),
+        'clock': 'frames',
+    }
+    script.options['images'] = {
+        **script.options.get('images', {}),
+        'path': images,
+    }
+    profile = os.path.join(tempfile.mkdtemp(), 'profile.json')
+
+    start = time.perf_counter()
+    screen = Screen(script, profile=profile)
+    construct = time.perf_counter() - start
+
+    start = time.perf_counter()
+    screen.run(frames=frames)
+    elapsed = time.perf_counter() - start
+
+    with open(profile) as f:
+        summary = json.load(f)
+    stages = summary['stages']
+    # loading carries on in run() until the opening actions have theirs
+    startup = stages['startup']['max'] / 1000
+    return {
+        'fps': frames / (elapsed - startup),
+        'frame_ms': {
+            key: stages['frame'][key]
+            for key in ('mean', 'p50', 'p95', 'p99', 'max')
+        },
+        'startup_ms': 1000 * (construct + startup),
+        'init_ms': {
+            name.split('.', 1)[1]: stage['max']
+            for name, stage in stages.items()
+            if name.startswith('init.')
+        },
+        'compositor': summary['compositor'],
+        'peak_rss_mb': peak_rss(),
+    }
+
+
+def spiral_case(mode: str, size: Size, frames: int) -> dict[str, Any]:
+    pygame.init()
+    start = time.perf_counter()
+    spiral = SPIRAL_MODES[mode](size=size, cache=False)
+    next(spiral)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        next(spiral)
+    elapsed = time.perf_counter() - start
+    return {
+        'build_ms': 1000 * build,
+        'next_us': 1e6 * elapsed / frames,
+        'peak_rss_mb': peak_rss(),
+    }
+
+
+def images_case(dir: str, size: Size, count: int) -> dict[str, Any]:
+    pygame.init()
+    pygame.display.set_mode(size)
+    start = time.perf_counter()
+    images = Images(size=size, dir=dir, cache=False)
+    next(images)
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(count):
+        while not images.depth:
+            time.sleep(0.001)
+        next(images)
+    elapsed = time.perf_counter() - start
+    return {
+        'first_ms': 1000 * first,
+        'image_ms': 1000 * elapsed / count,
+        'peak_rss_mb': peak_rss(),
+    }
+
+
+def script_case(path: str, count: int) -> dict[str, Any]:
+    start = time.perf_counter()
+    script = Script.load(path)
+    load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    n = sum(1 for _ in itertools.islice(script, count))
+    elapsed = time.perf_counter() - start
+    return {
+        'actions': n,
+        'load_ms': 1000 * load,
+        'action_us': 1e6 * elapsed / max(1, n),
+    }
+
+
+def make_images(dir: str, count: int = 8, size: Size = Size(3000, 2000)):
+    rng = random.Random(0)
+    for i in range(count):
+        image = pygame.Surface(size)
+        image.fill([rng.randrange(256) for _ in range(3)])
+        for _ in range(200):
+            color = [rng.randrange(256) for _ in range(3)]
+            center = (rng.randrange(size.x), rng.randrange(size.y))
+            pygame.draw.circle(image, color, center, rng.randrange(20, 400))
+        pygame.image.save(image, os.path.join(dir, f'bench{i}.png'))
+
+
+def run_isolated(fn: Callable[..., dict], *args) -> dict[str, Any]:
+    # one process per case so peak RSS and caches don't leak between cases
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context('spawn'),
+    ) as pool:
+        try:
+            return pool.submit(fn, *args).result()
+        except Exception as e:
+            return {'error': repr(e)}
+
+
+def parse_size(value: str) -> Size:
+    width, height = value.lower().split('x')
+    return Size(int(width), int(height))
+
+
+def report(name: str, result: dict[str, Any]) -> None:
+    fields = []
+    for key, value in result.items():
+        if isinstance(value, dict):
+            value = ' '.join(f'{k}={v:.2f}' for k, v in value.items())
+            fields.append(f'{key}[{value}]')
+        elif isinstance(value, float):
+            fields.append(f'{key}={value:.2f}')
+        else:
+            fields.append(f'{key}={value}')
+    print(f'{name:<32} ' + ' '.join(fields), flush=True)
+
+
+def main(
+    argv: Optional[list[str]] = None,
+    default_scripts: list[str] = (),
+) -> None:
+    parser = argparse.ArgumentParser(description='headless benchmarks')
+    parser.add_argument('scripts', nargs='*')
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument(
+        '--fps', type=int, default=60,
+        help='frame rate the simulated script clock steps at',
+    )
+    parser.add_argument(
+        '--sizes', nargs='+', type=parse_size, default=list(SIZES),
+    )
+    parser.add_argument('--images', help='image directory to load from')
+    parser.add_argument(
+        '--cold', action='store_true', help='start from an empty cache',
+    )
+    parser.add_argument('--output', help='write results as JSON to a file')
+    args = parser.parse_args(argv)
+    scripts = args.scripts or default_scripts
+
+    if args.cold:
+        os.environ['HYPNOKIT_CACHE'] = tempfile.mkdtemp()
+    images = args.images
+    if images is None:
+        images = tempfile.mkdtemp()
+        pygame.init()
+        make_images(images)
+
+    results = {}
+
+    def record(name, fn, *fn_args):
+        results[name] = run_isolated(fn, *fn_args)
+        report(name, results[name])
+
+    for size in args.sizes:
+        label = f'{size.x}x{size.y}'
+        for mode in SPIRAL_MODES:
+            record(f'spiral.{mode}.{label}', spiral_case, mode, size, 600)
+        record(f'images.{label}', images_case, images, size, 8)
+    for path in scripts:
+        name = os.path.splitext(os.path.basename(path))[0]
+        record(f'script.{name}', script_case, path, 10000)
+        for size in args.sizes:
+            label = f'{size.x}x{size.y}'
+            record(
+                f'screen.{name}.{label}',
+                screen_case, path, size, args.frames, images, args.fps,
+            )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
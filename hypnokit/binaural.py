@@ -0,0 +1,83 @@
+import functools
+import math
+import os
+
+import numpy
+import pygame
+
+from .cache import atomic_open, cache_dir, cache_key
+
+
+AMPLITUDE = 0.5
+
+# the longest loop we'll synthesize while looking for a seamless join
+MAX_LOOP_SECONDS = 10
+
+SAMPLE_FORMATS = {
+    8: (numpy.uint8, 127, 128),
+    -8: (numpy.int8, 127, 0),
+    16: (numpy.uint16, 32767, 32768),
+    -16: (numpy.int16, 32767, 0),
+    32: (numpy.float32, 1.0, 0),
+    -32: (numpy.int32, 2**31 - 1, 0),
+}
+
+
+def binaural_sound(frequency: float, wavelength: float) -> pygame.mixer.Sound:
+    rate, format, channels = pygame.mixer.get_init()
+    return cached_sound(frequency, wavelength, rate, format, channels)
+
+
+@functools.lru_cache(maxsize=8)
+def cached_sound(
+    frequency: float,
+    wavelength: float,
+    rate: int,
+    format: int,
+    channels: int,
+) -> pygame.mixer.Sound:
+    key = cache_key(
+        'binaural', frequency, wavelength, rate, format, channels, AMPLITUDE
+    )
+    path = os.path.join(cache_dir('binaural'), key + '.raw')
+    try:
+        with open(path, 'rb') as f:
+            return pygame.mixer.Sound(buffer=f.read())
+    except OSError:
+        pass
+    data = binaural_samples(frequency, wavelength, rate, format, channels)
+    with atomic_open(path) as f:
+        f.write(data)
+    return pygame.mixer.Sound(buffer=data)
+
+
+def binaural_samples(
+    frequency: float,
+    wavelength: float,
+    rate: int,
+    format: int,
+    channels: int,
+) -> bytes:
+    seconds = loop_seconds(frequency, frequency + wavelength)
+    count = int(seconds * rate)
+    index = numpy.arange(count, dtype=numpy.float64)
+    tones = [
+        numpy.sin(2 * math.pi * round(f * seconds) * index / count)
+        for f in (frequency, frequency + wavelength)
+    ]
+    if channels == 1:
+        tones = [(tones[0] + tones[1]) / 2]
+    samples = numpy.zeros((count, channels))
+    for channel, tone in enumerate(tones):
+        samples[:, channel] = AMPLITUDE * tone
+
+    dtype, scale, offset = SAMPLE_FORMATS[format]
+    return (samples * scale + offset).astype(dtype).tobytes()
+
+
+def loop_seconds(*frequencies: float) -> int:
+    # whole seconds in which every tone completes (nearly) whole cycles,
+    # so the sound loops without a click once they are rounded to fit
+    def error(seconds):
+        return sum(abs(f * seconds - round(f * seconds)) for f in frequencies)
+    return min(range(1, MAX_LOOP_SECONDS + 1), key=error)
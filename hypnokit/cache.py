@@ -0,0 +1,190 @@
+import contextlib
+import hashlib
+import marshal
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+import pygame
+
+from typing import Any, BinaryIO, Iterator, Optional
+
+
+# matches the byte order of the usual 32-bit XRGB display surface
+SURFACE_FORMAT = 'BGRA'
+
+SURFACE_COUNT = struct.Struct('<I')
+SURFACE_HEADER = struct.Struct('<II')
+
+PIXEL_SIZES = {
+    'P': 1,
+    'BGRA': 4,
+}
+
+# how much of its limit may be written into a directory before it is
+# scanned again, so that a large cache isn't walked on every save
+PRUNE_FRACTION = 0.1
+
+_written: dict[str, int] = {}
+_written_lock = threading.Lock()
+
+
+def cache_dir(*names: str) -> str:
+    root = os.environ.get('HYPNOKIT_CACHE') or os.path.join(
+        os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+        'hypnokit',
+    )
+    path = os.path.join(root, *names)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def cache_key(*parts: Any) -> str:
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+@contextlib.contextmanager
+def atomic_open(path: str) -> Iterator[BinaryIO]:
+    try:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    except OSError:
+        with open(os.devnull, 'wb') as f:
+            yield f
+        return
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def limit_dir(path: str, limit: int, suffix: str = '') -> None:
+    # call after writing path: once enough has been written since the
+    # last check, the least recently used files go until the rest fit
+    dir = os.path.dirname(path)
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    with _written_lock:
+        written = _written.get(dir)
+        if written is not None and written + size < limit * PRUNE_FRACTION:
+            _written[dir] = written + size
+            return
+        _written[dir] = 0
+    prune_dir(dir, limit, suffix)
+
+
+def prune_dir(dir: str, limit: int, suffix: str = '') -> int:
+    files = []
+    try:
+        with os.scandir(dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(suffix):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+    except OSError:
+        return 0
+    total = sum(size for _, size, _ in files)
+    freed = 0
+    # loading a file touches it, so the oldest are the least recently used
+    for _, size, path in sorted(files):
+        if total - freed <= limit:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            # mapped on Windows, or already gone
+            continue
+        freed += size
+    return freed
+
+
+def load_marshal(path: str) -> Any:
+    try:
+        with open(path, 'rb') as f:
+            return marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+
+def save_marshal(path: str, value: Any) -> None:
+    try:
+        data = marshal.dumps(value)
+    except ValueError:
+        return
+    with atomic_open(path) as f:
+        f.write(data)
+
+
+def load_surfaces(
+    path: str,
+    format: str = SURFACE_FORMAT,
+) -> Optional[list[pygame.Surface]]:
+    try:
+        with open(path, 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    except (OSError, ValueError):
+        return None
+    with contextlib.suppress(OSError):
+        # counts as a use, for prune_dir
+        os.utime(path)
+    if len(buf) < SURFACE_COUNT.size:
+        return None
+    (count,) = SURFACE_COUNT.unpack_from(buf)
+    offset = SURFACE_COUNT.size
+    sizes = []
+    for _ in range(count):
+        sizes.append(SURFACE_HEADER.unpack_from(buf, offset))
+        offset += SURFACE_HEADER.size
+    pixels = memoryview(buf)
+    surfaces = []
+    for width, height in sizes:
+        end = offset + width * height * PIXEL_SIZES[format]
+        if end > len(buf):
+            return None
+        surfaces.append(pygame.image.frombuffer(
+            pixels[offset:end], (width, height), format
+        ))
+        offset = end
+    return surfaces
+
+
+def save_surfaces(
+    path: str,
+    surfaces: list[pygame.Surface],
+    format: str = SURFACE_FORMAT,
+) -> None:
+    with atomic_open(path) as f:
+        f.write(SURFACE_COUNT.pack(len(surfaces)))
+        for surface in surfaces:
+            f.write(SURFACE_HEADER.pack(*surface.get_size()))
+        for surface in surfaces:
+            f.write(pygame.image.tobytes(surface, format))
+
+
+def load_surface(path: str) -> Optional[pygame.Surface]:
+    surfaces = load_surfaces(path)
+    return surfaces[0] if surfaces else None
+
+
+def save_surface(path: str, surface: pygame.Surface) -> None:
+    save_surfaces(path, [surface])
+
+
+def sound_bytes(sound: pygame.mixer.Sound) -> int:
+    return memoryview(sound).nbytes
+
+
+def surface_bytes(surface: pygame.Surface) -> int:
+    return surface.get_pitch() * surface.get_height()
@@ -0,0 +1,153 @@
+import math
+
+import pygame
+
+from typing import NamedTuple, Optional
+from .cache import surface_bytes
+from .profiler import NullProfiler, Profiler
+
+
+class Layer(NamedTuple):
+    name: str
+    surface: pygame.Surface
+    special_flags: int = 0
+    version: int = 0
+    angle: float = 0
+    scale: float = 1.0
+    static: bool = False
+
+
+class Compositor:
+    background_color: str = "black"
+    full_threshold: float = 0.5
+    profiler: Profiler = NullProfiler()
+
+    composites: int = 0
+    flips: int = 0
+    skips: int = 0
+    updates: int = 0
+
+    __layers: Optional[dict[str, Layer]] = None
+    __static: Optional[pygame.Surface] = None
+    __static_layers: Optional[list[Layer]] = None
+    __surface: pygame.Surface
+
+    def __init__(self, surface: pygame.Surface, **kwargs):
+        self.__surface = surface
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    def draw(self, layers: list[Layer]) -> None:
+        screen = self.__surface.get_rect()
+        dirty = self.__dirty_rects(layers)
+        self.__layers = {layer.name: layer for layer in layers}
+        if not dirty:
+            self.skips += 1
+            return
+
+        area = dirty[0].unionall(dirty[1:]).clip(screen)
+        if area.w * area.h >= self.full_threshold * screen.w * screen.h:
+            area = screen
+
+        # everything static is already flattened into one opaque surface
+        static = self.__composite([layer for layer in layers if layer.static])
+        self.__surface.set_clip(area)
+        with self.profiler.stage('blit.static'):
+            self.__surface.blit(static, (0, 0))
+        for layer in layers:
+            if not layer.static:
+                with self.profiler.stage('blit.' + layer.name):
+                    self.__blit(self.__surface, layer)
+        self.__surface.set_clip(None)
+
+        if area == screen:
+            self.flips += 1
+            with self.profiler.stage('flip'):
+                pygame.display.flip()
+        else:
+            self.updates += 1
+            with self.profiler.stage('update'):
+                pygame.display.update(area)
+
+    @property
+    def nbytes(self) -> int:
+        return surface_bytes(self.__static) if self.__static else 0
+
+    def invalidate(self) -> None:
+        self.__layers = None
+        self.__static_layers = None
+
+    def __blit(self, target: pygame.Surface, layer: Layer) -> None:
+        surface = layer.surface
+        if layer.scale != 1:
+            surface = pygame.transform.scale_by(surface, layer.scale)
+        if layer.angle:
+            surface = pygame.transform.rotate(surface, -layer.angle)
+        target.blit(
+            surface,
+            centered(target.get_size(), surface.get_rect()),
+            special_flags=layer.special_flags,
+        )
+
+    def __composite(self, layers: list[Layer]) -> pygame.Surface:
+        size = self.__surface.get_size()
+        if layers == self.__static_layers and self.__static.get_size() == size:
+            return self.__static
+        with self.profiler.stage('composite'):
+            if self.__static is None or self.__static.get_size() != size:
+                # same pixel format as the display, so blitting it is a copy
+                self.__static = pygame.Surface(size, 0, self.__surface)
+            self.__static.fill(self.background_color)
+            for layer in layers:
+                self.__blit(self.__static, layer)
+        self.__static_layers = layers
+        self.composites += 1
+        return self.__static
+
+    def __dirty_rects(self, layers: list[Layer]) -> list[pygame.Rect]:
+        if self.__layers is None:
+            return [self.__surface.get_rect()]
+        size = self.__surface.get_size()
+        current = {layer.name: layer for layer in layers}
+        dirty = []
+        for name in self.__layers.keys() | current.keys():
+            old, new = self.__layers.get(name), current.get(name)
+            if old == new:
+                continue
+            for layer in (old, new):
+                if layer is not None:
+                    dirty.append(bounds(size, layer))
+        return dirty
+
+
+def bounds(size: tuple[int, int], layer: Layer) -> pygame.Rect:
+    rect = layer.surface.get_rect()
+    if layer.scale != 1:
+        rect.size = (
+            math.ceil(rect.w * layer.scale),
+            math.ceil(rect.h * layer.scale),
+        )
+    if layer.angle:
+        theta = math.radians(layer.angle)
+        cos, sin = abs(math.cos(theta)), abs(math.sin(theta))
+        rect.size = (
+            math.ceil(rect.w * cos + rect.h * sin),
+            math.ceil(rect.w * sin + rect.h * cos),
+        )
+    return centered(size, rect)
+
+
+def centered(size: tuple[int, int], rect: pygame.Rect) -> pygame.Rect:
+    width, height = size
+    rect = pygame.Rect((0, 0), rect.size)
+    cx, cy = rect.center
+    rect.topleft = (int((width/2) - cx), int((height/2) - cy))
+    return rect
+
+
+def display_format(surface: pygame.Surface) -> pygame.Surface:
+    # the renderer backend has no display surface to match, and uploads
+    # surfaces to textures as they are
+    if pygame.display.get_surface() is None:
+        return surface
+    return surface.convert()
@@ -0,0 +1,247 @@
+import concurrent.futures
+import contextlib
+import math
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import wave
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import numpy  # noqa: E402
+import pygame  # noqa: E402
+
+from .binaural import SAMPLE_FORMATS, binaural_sound  # noqa: E402
+from .recorder import Recorder, Voice  # noqa: E402
+from .screen import Screen  # noqa: E402
+from .script import Script  # noqa: E402
+from .types import Size  # noqa: E402
+
+from typing import BinaryIO, Iterator, Optional  # noqa: E402
+
+
+FORMATS = ('raw', 'images', 'pipe')
+
+PIXEL_FORMAT = 'RGB'
+
+# how much of the script a worker renders before handing it back
+SEGMENT_MILLIS = 60000
+
+
+class RawWriter:
+    __file: BinaryIO
+
+    def __init__(self, path: str):
+        self.__file = open(path, 'wb')
+
+    def __call__(self, index: int, surface: pygame.Surface) -> None:
+        self.__file.write(pygame.image.tobytes(surface, PIXEL_FORMAT))
+
+    def close(self) -> None:
+        self.__file.close()
+
+
+class ImageWriter:
+    first: int
+    pattern: str
+
+    def __init__(self, pattern: str, first: int = 0):
+        self.pattern = pattern
+        self.first = first
+        os.makedirs(os.path.dirname(pattern) or '.', exist_ok=True)
+
+    def __call__(self, index: int, surface: pygame.Surface) -> None:
+        pygame.image.save(surface, self.pattern % (self.first + index))
+
+    def close(self) -> None:
+        pass
+
+
+def render_range(
+    path: str,
+    size: Size,
+    frames_per_second: int,
+    first: int,
+    count: int,
+    format: str,
+    output: str,
+) -> list[Voice]:
+    script = Script.load(path)
+    script.options['screen'] = {
+        **(script.options.get('screen') or {}),
+        'size': list(size),
+    }
+    if format == 'images':
+        write = ImageWriter(output, first)
+    else:
+        write = RawWriter(output)
+    recorder = Recorder(
+        write,
+        frames_per_second=frames_per_second,
+        start=1000 * first / frames_per_second,
+    )
+    try:
+        screen = Screen(script, recorder=recorder)
+        screen.run(
+            frames=count,
+            start=round(recorder.start) if first else None,
+        )
+    finally:
+        write.close()
+    return recorder.close()
+
+
+@contextlib.contextmanager
+def open_output(format: str, output: str) -> Iterator[Optional[BinaryIO]]:
+    if format == 'images':
+        yield None
+    elif format == 'pipe':
+        process = subprocess.Popen(output, shell=True, stdin=subprocess.PIPE)
+        try:
+            yield process.stdin
+        finally:
+            process.stdin.close()
+            process.wait()
+    elif output == '-':
+        yield sys.stdout.buffer
+    else:
+        with open(output, 'wb') as f:
+            yield f
+
+
+def export(
+    path: str,
+    output: str,
+    format: str = 'raw',
+    size: Size = Size(1280, 720),
+    frames_per_second: int = 30,
+    start: int = 0,
+    end: Optional[int] = None,
+    audio: Optional[str] = None,
+    jobs: Optional[int] = None,
+) -> None:
+    if format not in FORMATS:
+        raise ValueError(f'unknown export format: {format!r}')
+    if end is None:
+        end = Script.load(path).duration()
+        if end is None:
+            raise ValueError('the script never ends, give an end time')
+
+    first = round(start * frames_per_second / 1000)
+    last = round(end * frames_per_second / 1000)
+    step = max(1, round(SEGMENT_MILLIS * frames_per_second / 1000))
+    segments = [
+        (frame, min(step, last - frame))
+        for frame in range(first, last, step)
+    ]
+
+    tmp = tempfile.mkdtemp()
+    voices = []
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs,
+            mp_context=multiprocessing.get_context('spawn'),
+        ) as pool, open_output(format, output) as sink:
+            kind = 'images' if format == 'images' else 'raw'
+            futures = []
+            for i, (frame, count) in enumerate(segments):
+                target = output
+                if kind == 'raw':
+                    target = os.path.join(tmp, f'{i:05}.raw')
+                futures.append(pool.submit(
+                    render_range, path, size, frames_per_second,
+                    frame, count, kind, target,
+                ))
+            # segments finish out of order but are streamed in order
+            for i, future in enumerate(futures):
+                voices += future.result()
+                if sink is not None:
+                    segment = os.path.join(tmp, f'{i:05}.raw')
+                    with open(segment, 'rb') as f:
+                        shutil.copyfileobj(f, sink)
+                    os.remove(segment)
+                print(f'exported {i + 1}/{len(futures)}', file=sys.stderr)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if audio:
+        write_audio(
+            audio,
+            join_voices(voices),
+            1000 * first / frames_per_second,
+            1000 * last / frames_per_second,
+        )
+
+
+def join_voices(voices: list[Voice]) -> list[Voice]:
+    # every segment stops its loops at its end and starts them again at
+    # the next one's start, so carry the position on or the seam clicks
+    joined = []
+    last = {}
+    for voice in sorted(voices, key=lambda voice: voice.start):
+        previous = last.get(voice.source)
+        if (
+            previous is not None and previous.loop and voice.loop
+            and previous.end is not None
+            and math.isclose(previous.end, voice.start, abs_tol=1e-3)
+        ):
+            played = (previous.end - previous.start) / 1000
+            voice = voice._replace(offset=previous.offset + played)
+        last[voice.source] = voice
+        joined.append(voice)
+    return joined
+
+
+def write_audio(
+    path: str,
+    voices: list[Voice],
+    start: float,
+    end: float,
+) -> None:
+    pygame.mixer.init()
+    rate, format, channels = pygame.mixer.get_init()
+    sources = {}
+
+    def samples(source: tuple) -> numpy.ndarray:
+        if source not in sources:
+            kind, *args = source
+            if kind == 'binaural':
+                sound = binaural_sound(*args)
+            else:
+                sound = pygame.mixer.Sound(args[0])
+            _, scale, offset = SAMPLE_FORMATS[format]
+            data = pygame.sndarray.array(sound).astype(numpy.float32)
+            sources[source] = ((data - offset) / scale).reshape(-1, channels)
+        return sources[source]
+
+    def sample(millis: float) -> int:
+        return round((millis - start) * rate / 1000)
+
+    total = sample(end)
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        for block in range(0, total, rate):
+            out = numpy.zeros((min(rate, total - block), channels))
+            for voice in voices:
+                data = samples(voice.source)
+                begin = sample(voice.start)
+                skip = round(voice.offset * rate)
+                stop = math.inf if voice.loop else begin + len(data) - skip
+                if voice.end is not None:
+                    stop = min(stop, sample(voice.end))
+                lo = max(block, begin)
+                hi = min(block + len(out), stop)
+                if lo >= hi:
+                    continue
+                index = numpy.arange(lo, hi) - begin + skip
+                if voice.loop:
+                    index %= len(data)
+                out[lo - block:hi - block] += voice.volume * data[index]
+            out = numpy.clip(out, -1, 1) * 32767
+            f.writeframes(out.astype('<i2').tobytes())
@@ -1,9 +1,19 @@
 import os
+import queue
 import random
+import threading
+import time
 
 import pygame
 
-from typing import Iterator
+from typing import Iterator, Optional
+from .cache import (
+    cache_dir, cache_key, limit_dir, load_surface, save_surface,
+    surface_bytes,
+)
+from .compositor import display_format
+from .index import ImageIndex, shared_index
+from .memory import MEGABYTE
 from .types import Size
 
 
@@ -12,34 +22,140 @@ class Images:
     size: Size
 
     alpha: int = 200
+    blocking: bool = False
+    cache: bool = True
+    cache_limit: int = 4096  # megabytes on disk for images of every size
+    prefetch: int = 3
+    timeout: float = 0.1  # seconds between checks while waiting on a decode
 
-    __iter: Iterator[pygame.Surface] = None
+    hits: int = 0
+    misses: int = 0
+
+    __closed: bool = False
+    __current: pygame.Surface = None
+    __index: ImageIndex
+    __iter: Iterator[str] = None
+    __queue: queue.Queue = None
+    __thread: threading.Thread = None
 
     def __init__(self, size: Size, dir: str, **kwargs):
         self.size = size
         self.dir = os.path.abspath(dir)
         for key, value in kwargs.items():
             setattr(self, key, value)
-        self.__filenames = os.listdir(self.dir)
+        self.__index = shared_index(self.dir, self.cache)
+        self.__queue = queue.Queue(maxsize=max(1, self.prefetch))
+        self.__settled = threading.Event()
+        self.__thread = threading.Thread(
+            target=self.__prefetch,
+            daemon=True,
+        )
+        self.__thread.start()
+
+    @property
+    def depth(self) -> int:
+        return self.__queue.qsize()
+
+    @property
+    def nbytes(self) -> int:
+        with self.__queue.mutex:
+            images = list(self.__queue.queue)
+        if self.__current is not None:
+            images.append(self.__current)
+        return sum(surface_bytes(image) for image in images)
+
+    @property
+    def ready(self) -> bool:
+        return self.__current is not None or not self.__queue.empty()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        # until the first image is decoded or there turn out to be none
+        self.__settled.wait(timeout)
+        return self.ready
+
+    def close(self) -> None:
+        self.__closed = True
+        self.__settled.set()
+        self.__index.save()
+        # make room in case the worker is blocked on a full queue
+        while True:
+            try:
+                self.__queue.get_nowait()
+            except queue.Empty:
+                break
 
     def __iter__(self) -> Iterator[pygame.Surface]:
         return self
 
-    def __next__(self) -> pygame.Surface:
+    def __next__(self) -> Optional[pygame.Surface]:
+        try:
+            self.__current = self.__queue.get_nowait()
+            self.hits += 1
+        except queue.Empty:
+            self.misses += 1
+            if self.__current is None or self.blocking:
+                self.__current = self.__wait() or self.__current
+        return self.__current
+
+    def __wait(self) -> Optional[pygame.Surface]:
+        # there's nothing coming once every file has turned out unusable
+        while len(self.__index):
+            try:
+                return self.__queue.get(timeout=self.timeout)
+            except queue.Empty:
+                pass
+        return None
+
+    def __next_filename(self) -> Optional[str]:
+        if self.__index.refresh():
+            # new files join the next shuffle rather than waiting a pass
+            self.__iter = None
         if self.__iter is None:
-            filenames = random.sample(self.__filenames, len(self.__filenames))
-            self.__iter = iter(filenames)
+            filenames = self.__index.names
+            if not filenames:
+                return None
+            self.__iter = iter(random.sample(filenames, len(filenames)))
         try:
-            filename = next(self.__iter)
-            return self.__load_image(filename)
+            return next(self.__iter)
         except StopIteration:
             self.__iter = None
-            return next(self)
+            return self.__next_filename()
+
+    def __prefetch(self):
+        while not self.__closed:
+            filename = self.__next_filename()
+            if filename is None:
+                self.__settled.set()
+                time.sleep(self.__index.rescan)
+                continue
+            try:
+                image = self.__load_image(filename)
+            except (OSError, pygame.error):
+                self.__index.record(filename, None)
+                continue
+            self.__queue.put(image)
+            self.__settled.set()
+
+    def __cache_path(self, path: str) -> Optional[str]:
+        if not self.cache:
+            return None
+        key = cache_key(path, os.path.getmtime(path), self.size, self.alpha)
+        return os.path.join(cache_dir('images'), key + '.raw')
 
     def __load_image(self, filename) -> pygame.Surface:
         path = os.path.join(self.dir, filename)
-        image = pygame.image.load(path).convert()
-        image = self.__scale_image(image)
+        cache_path = self.__cache_path(path)
+        image = cache_path and load_surface(cache_path)
+        if image:
+            image = display_format(image)
+        else:
+            image = display_format(pygame.image.load(path))
+            self.__index.record(filename, image.get_size())
+            image = self.__scale_image(image)
+            if cache_path:
+                save_surface(cache_path, image)
+                # the folder's index lives alongside and isn't counted
+                limit_dir(cache_path, self.cache_limit * MEGABYTE, '.raw')
         image.set_alpha(self.alpha)
         return image
 
@@ -47,4 +163,4 @@ class Images:
         width, height = (self.size.x * 1.1, self.size.y * 1.1)
         pic_width, pic_height = image.get_size()
         scale = max(width / pic_width, height / pic_height)
-        return pygame.transform.rotozoom(image, 0, scale).convert()
+        return display_format(pygame.transform.rotozoom(image, 0, scale))
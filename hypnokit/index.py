@@ -0,0 +1,147 @@
+import functools
+import os
+import sys
+import threading
+import time
+
+from typing import Optional
+from .cache import cache_dir, cache_key, load_marshal, save_marshal
+
+
+INDEX_VERSION = 1
+
+# what pygame.image.load can decode
+IMAGE_TYPES = frozenset((
+    '.bmp', '.gif', '.jpeg', '.jpg', '.lbm', '.pbm', '.pcx', '.pgm', '.png',
+    '.pnm', '.ppm', '.qoi', '.svg', '.tga', '.tif', '.tiff', '.webp', '.xpm',
+))
+
+
+class ImageIndex:
+    dir: str
+
+    cache: bool = True
+    rescan: float = 5.0  # seconds between directory mtime checks
+
+    scans: int = 0
+
+    __broken: set[str]
+    __checked: float = 0
+    __dirty: bool = False
+    __missing: bool = False
+    __mtime: Optional[int] = None
+    __sizes: dict[str, Optional[tuple[int, int]]]
+
+    def __init__(self, dir: str, **kwargs):
+        self.dir = os.path.abspath(dir)
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+        self.__lock = threading.Lock()
+        self.__broken = set()
+        self.__sizes = {}
+        if not self.__load():
+            self.__scan()
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__sizes) - len(self.__broken)
+
+    @property
+    def names(self) -> list[str]:
+        with self.__lock:
+            return [n for n in self.__sizes if n not in self.__broken]
+
+    def dimensions(self, name: str) -> Optional[tuple[int, int]]:
+        with self.__lock:
+            return self.__sizes.get(name)
+
+    def record(self, name: str, size: Optional[tuple[int, int]]) -> None:
+        # a size of None means the file couldn't be decoded
+        with self.__lock:
+            if name not in self.__sizes:
+                return
+            if size is None:
+                self.__broken.add(name)
+            else:
+                self.__sizes[name] = tuple(size)
+            self.__dirty = True
+
+    def refresh(self) -> bool:
+        now = time.monotonic()
+        if now - self.__checked < self.rescan:
+            return False
+        self.__checked = now
+        changed = self.__stat() != self.__mtime
+        if changed:
+            self.__scan()
+        self.save()
+        return changed
+
+    def save(self) -> None:
+        with self.__lock:
+            if not self.__dirty or not self.cache:
+                return
+            data = (
+                INDEX_VERSION,
+                self.__mtime,
+                self.__sizes,
+                sorted(self.__broken),
+            )
+            self.__dirty = False
+        save_marshal(self.__path(), data)
+
+    def __load(self) -> bool:
+        if not self.cache:
+            return False
+        data = load_marshal(self.__path())
+        mtime = self.__stat()
+        if mtime is None:
+            return False
+        if not data or data[0] != INDEX_VERSION or data[1] != mtime:
+            return False
+        _, self.__mtime, self.__sizes, broken = data
+        self.__broken = set(broken)
+        self.__checked = time.monotonic()
+        return True
+
+    def __path(self) -> str:
+        name = cache_key(self.dir) + '.index'
+        return os.path.join(cache_dir('images'), name)
+
+    def __scan(self) -> None:
+        mtime = self.__stat()
+        names = []
+        try:
+            with os.scandir(self.dir) as entries:
+                for entry in entries:
+                    ext = os.path.splitext(entry.name)[1].lower()
+                    if ext in IMAGE_TYPES and entry.is_file():
+                        names.append(entry.name)
+        except OSError as e:
+            # an empty index means no images; only say why the first time
+            if not self.__missing:
+                print(f'cannot read image folder: {e}', file=sys.stderr)
+            self.__missing = True
+        else:
+            self.__missing = False
+        with self.__lock:
+            # keep what we learned about files that are still there, but
+            # give the broken ones another chance since the folder changed
+            self.__sizes = {name: self.__sizes.get(name) for name in names}
+            self.__broken.clear()
+            self.__mtime = mtime
+            self.__dirty = True
+        self.__checked = time.monotonic()
+        self.scans += 1
+
+    def __stat(self) -> Optional[int]:
+        try:
+            return os.stat(self.dir).st_mtime_ns
+        except OSError:
+            return None
+
+
+@functools.lru_cache(maxsize=None)
+def shared_index(dir: str, cache: bool = True) -> ImageIndex:
+    # images for every window size draw from the same folder
+    return ImageIndex(dir, cache=cache)
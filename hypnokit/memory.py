@@ -0,0 +1,72 @@
+import sys
+import time
+
+from typing import Callable, TextIO
+
+
+MEGABYTE = 2**20
+
+
+class MemoryBudget:
+    budget: int = 1024 * MEGABYTE
+    log: float = 0  # seconds between usage lines, 0 for none
+    file: TextIO = sys.stderr
+
+    freed: int = 0
+
+    __evictors: list[Callable[[int], int]]
+    __holders: dict[str, Callable[[], int]]
+    __logged: float = 0
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+        self.__evictors = []
+        self.__holders = {}
+        self.__logged = time.monotonic()
+
+    @property
+    def total(self) -> int:
+        return sum(self.usage().values())
+
+    def add(self, name: str, nbytes: Callable[[], int]) -> None:
+        self.__holders[name] = nbytes
+
+    def add_evictor(self, evict: Callable[[int], int]) -> None:
+        # evictors are asked in the order they were added, each freeing up
+        # to the given number of bytes and returning how many it did
+        self.__evictors.append(evict)
+
+    def enforce(self) -> int:
+        over = self.total - self.budget
+        freed = 0
+        for evict in self.__evictors:
+            if over <= freed:
+                break
+            freed += evict(over - freed)
+        self.freed += freed
+        return freed
+
+    def update(self) -> None:
+        self.enforce()
+        now = time.monotonic()
+        if self.log and now - self.__logged >= self.log:
+            self.__logged = now
+            print(self.report(), file=self.file)
+
+    def report(self) -> str:
+        usage = self.usage()
+        holders = ', '.join(
+            f'{name} {megabytes(nbytes)}' for name, nbytes in usage.items()
+        )
+        return (
+            f'memory: {megabytes(sum(usage.values()))} of '
+            f'{megabytes(self.budget)} MB ({holders})'
+        )
+
+    def usage(self) -> dict[str, int]:
+        return {name: nbytes() for name, nbytes in self.__holders.items()}
+
+
+def megabytes(nbytes: int) -> str:
+    return f'{nbytes / MEGABYTE:.1f}'
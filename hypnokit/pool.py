@@ -0,0 +1,109 @@
+import concurrent.futures
+import itertools
+import multiprocessing
+import multiprocessing.util
+import os
+import queue
+import threading
+
+from typing import Any, Callable, Optional
+
+
+class PriorityPool:
+    workers: Optional[int] = None
+
+    __closed: bool = False
+    __executor: concurrent.futures.ProcessPoolExecutor
+    __queue: queue.PriorityQueue
+    __slots: threading.Semaphore
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+        self.workers = workers = self.workers or os.cpu_count() or 1
+        self.__executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+        self.__order = itertools.count()
+        self.__queue = queue.PriorityQueue()
+        # only hand the executor as much as it can start on, so that
+        # anything more urgent submitted later doesn't queue behind it
+        self.__slots = threading.Semaphore(workers)
+        self.__thread = threading.Thread(target=self.__dispatch, daemon=True)
+        self.__thread.start()
+
+    def submit(
+        self,
+        priority: float,
+        fn: Callable[..., Any],
+        *args: Any,
+    ) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        if self.__closed:
+            future.cancel()
+            return future
+        self.__queue.put((priority, next(self.__order), future, fn, args))
+        return future
+
+    def shutdown(self) -> None:
+        # waits on whatever is running, but nothing queued behind it, and
+        # anyone waiting on those sees them cancelled rather than failed
+        self.__closed = True
+        self.__executor.shutdown(cancel_futures=True)
+        while True:
+            try:
+                _, _, future, _, _ = self.__queue.get_nowait()
+            except queue.Empty:
+                break
+            future.cancel()
+
+    def __dispatch(self):
+        while True:
+            self.__slots.acquire()
+            _, _, future, fn, args = self.__queue.get()
+            try:
+                task = self.__executor.submit(fn, *args)
+            except Exception as e:
+                self.__slots.release()
+                if self.__closed:
+                    future.cancel()
+                else:
+                    future.set_exception(e)
+                continue
+            task.add_done_callback(
+                lambda task, future=future: self.__done(task, future)
+            )
+
+    def __done(
+        self,
+        task: concurrent.futures.Future,
+        future: concurrent.futures.Future,
+    ):
+        self.__slots.release()
+        if task.cancelled():
+            future.cancel()
+            return
+        try:
+            future.set_result(task.result())
+        except Exception as e:
+            future.set_exception(e)
+
+
+_pool: Optional[PriorityPool] = None
+_lock = threading.Lock()
+
+
+def shared_pool() -> PriorityPool:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = PriorityPool()
+            # atexit handlers never run in a multiprocessing child, which
+            # would then wait forever on the idle workers before exiting.
+            # Finalizers run in every process, and this one has to come
+            # before the executor's own queues close at priority 10
+            multiprocessing.util.Finalize(
+                _pool, _pool.shutdown, exitpriority=20,
+            )
+        return _pool
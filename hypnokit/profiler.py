@@ -0,0 +1,122 @@
+import array
+import contextlib
+import csv
+import json
+import time
+
+from typing import Any, ContextManager, Iterator, Optional
+
+
+PERCENTILES = (50, 95, 99)
+
+
+class Profiler:
+    frames_per_second: int = 60
+    path: str = 'profile.json'
+
+    frames: int = 0
+    late: int = 0
+    dropped: int = 0
+
+    __last: float = None
+    __samples: dict[str, array.array]
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+        self.__samples = {}
+
+    def frame(self, period: Optional[float] = None) -> None:
+        now = time.perf_counter()
+        if self.__last is not None:
+            millis = 1000 * (now - self.__last)
+            self.__record('frame', millis)
+            if period:
+                self.__check_deadline(millis, period)
+        self.frames += 1
+        self.__last = now
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.__record(name, 1000 * (time.perf_counter() - start))
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            'frames': self.frames,
+            'frames_per_second': self.frames_per_second,
+            'late': self.late,
+            'dropped': self.dropped,
+            'stages': {
+                name: stage_summary(samples)
+                for name, samples in self.__samples.items()
+            },
+        }
+
+    def write(self, **extra: Any) -> None:
+        summary = {**self.summary(), **extra}
+        with open(self.path, 'w', newline='') as f:
+            if self.path.endswith('.csv'):
+                self.__write_csv(f, summary)
+            else:
+                json.dump(summary, f, indent=2)
+
+    def __check_deadline(self, millis: float, period: float) -> None:
+        # allow for the granularity of the OS sleep
+        if millis > period + 1:
+            self.late += 1
+            self.dropped += max(0, round(millis / period) - 1)
+
+    def __record(self, name: str, millis: float) -> None:
+        if name not in self.__samples:
+            self.__samples[name] = array.array('d')
+        self.__samples[name].append(millis)
+
+    def __write_csv(self, f, summary: dict[str, Any]) -> None:
+        fields = ['stage', 'count', 'mean', 'max'] + [
+            f'p{p}' for p in PERCENTILES
+        ]
+        writer = csv.DictWriter(f, fields)
+        writer.writeheader()
+        for name, stage in summary['stages'].items():
+            writer.writerow({'stage': name, **stage})
+        # then everything else, after a blank line, as a table of its own
+        writer = csv.writer(f)
+        writer.writerows([[], ['name', 'value']])
+        writer.writerows(flatten({
+            key: value for key, value in summary.items() if key != 'stages'
+        }))
+
+
+class NullProfiler:
+    def frame(self, period: Optional[float] = None) -> None:
+        pass
+
+    def stage(self, name: str) -> ContextManager[None]:
+        return contextlib.nullcontext()
+
+    def write(self, **extra: Any) -> None:
+        pass
+
+
+def stage_summary(samples: array.array) -> dict[str, float]:
+    ordered = sorted(samples)
+    summary = {
+        'count': len(ordered),
+        'mean': sum(ordered) / len(ordered),
+        'max': ordered[-1],
+    }
+    for p in PERCENTILES:
+        summary[f'p{p}'] = ordered[int(p / 100 * (len(ordered) - 1))]
+    return summary
+
+
+def flatten(values: dict[str, Any], prefix: str = '') -> Iterator[list[Any]]:
+    for key, value in values.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f'{prefix}{key}.')
+        else:
+            yield [f'{prefix}{key}', value]
@@ -0,0 +1,133 @@
+import sys
+
+import pygame
+
+from typing import Callable, NamedTuple, Optional
+from .speech import init_engine, synthesize
+
+
+class Voice(NamedTuple):
+    start: float
+    source: tuple
+    volume: float = 1.0
+    offset: float = 0.0
+    loop: bool = False
+    end: Optional[float] = None
+
+
+class Recorder:
+    frames_per_second: int = 30
+    start: float = 0
+
+    frames: int = 0
+
+    __playing: dict[str, Voice]
+    __write: Callable[[int, pygame.Surface], None]
+
+    def __init__(self, write: Callable[[int, pygame.Surface], None], **kwargs):
+        self.__write = write
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+        self.__playing = {}
+        self.voices = []
+
+    def clock(self) -> float:
+        return self.start + 1000 * self.frames / self.frames_per_second
+
+    def frame(self, surface: pygame.Surface) -> None:
+        self.__write(self.frames, surface)
+        self.frames += 1
+
+    def play(
+        self,
+        name: str,
+        source: tuple,
+        volume: float = 1.0,
+        offset: float = 0.0,
+        loop: bool = False,
+        start: Optional[float] = None,
+    ) -> None:
+        playing = self.__playing.get(name)
+        if playing and playing.loop and loop and playing.source == source:
+            # like the mixer, re-enabling a loop leaves it where it was
+            return
+        if playing and not playing.loop:
+            # a one-shot plays out, anything after it was queued behind it
+            self.voices.append(self.__playing.pop(name))
+        self.stop(name)
+        self.__playing[name] = Voice(
+            self.clock() if start is None else start,
+            source, volume, offset, loop,
+        )
+
+    def stop(self, name: str) -> None:
+        voice = self.__playing.pop(name, None)
+        if voice is not None:
+            self.voices.append(voice._replace(end=self.clock()))
+
+    def close(self) -> list[Voice]:
+        # loops end with the recording, one-shots like speech play out
+        for name in list(self.__playing):
+            if self.__playing[name].loop:
+                self.stop(name)
+            else:
+                self.voices.append(self.__playing.pop(name))
+        return self.voices
+
+
+class RecordedSpeech:
+    rate: int = 150
+    voice: str = None
+    volume: float = 1.0
+
+    __recorder: Recorder
+    __sounds: dict[str, Optional[tuple[str, float]]]
+    __until: float = 0
+
+    def __init__(self, recorder: Recorder, **kwargs):
+        self.__recorder = recorder
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+        self.__sounds = {}
+        self.__engine = init_engine(self.voice, self.rate, self.volume)
+
+    @property
+    def busy(self) -> bool:
+        return self.__recorder.clock() < self.__until
+
+    @property
+    def nbytes(self) -> int:
+        # sounds are mixed from their files after the recording
+        return 0
+
+    def handle(self, event: pygame.event.Event):
+        pass
+
+    def prepare(self, *texts: str):
+        # the simulated clock waits for synthesis, so there's no need to
+        # get ahead of it
+        pass
+
+    def say(self, text: str):
+        sound = self.__sound(text)
+        if sound is None:
+            return
+        path, length = sound
+        # queued behind whatever is still being said
+        start = max(self.__recorder.clock(), self.__until)
+        self.__recorder.play('speech', ('file', path), start=start)
+        self.__until = start + 1000 * length
+
+    def __sound(self, text: str) -> Optional[tuple[str, float]]:
+        if text not in self.__sounds:
+            self.__sounds[text] = None
+            if self.__engine:
+                try:
+                    path = synthesize(
+                        self.__engine, text, self.voice, self.rate, self.volume
+                    )
+                    length = pygame.mixer.Sound(path).get_length()
+                    self.__sounds[text] = (path, length)
+                except Exception as e:
+                    print(f'speech failed for {text!r}: {e}', file=sys.stderr)
+        return self.__sounds[text]
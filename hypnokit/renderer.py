@@ -0,0 +1,91 @@
+import weakref
+
+import pygame
+from pygame._sdl2 import video
+
+from typing import Optional
+from .compositor import Layer, centered
+from .profiler import NullProfiler, Profiler
+
+
+# SDL_BlendMode values
+BLENDMODE_BLEND = 1
+BLENDMODE_ADD = 2
+
+BLEND_MODES = {
+    0: BLENDMODE_BLEND,
+    pygame.BLEND_RGB_ADD: BLENDMODE_ADD,
+    pygame.BLEND_RGBA_ADD: BLENDMODE_ADD,
+}
+
+
+class TextureCompositor:
+    background_color: str = "black"
+    profiler: Profiler = NullProfiler()
+
+    composites: int = 0
+    flips: int = 0
+    skips: int = 0
+    updates: int = 0
+    uploads: int = 0
+
+    __layers: Optional[list[Layer]] = None
+    __renderer: video.Renderer
+    __textures: weakref.WeakKeyDictionary
+
+    def __init__(self, renderer: video.Renderer, **kwargs):
+        self.__renderer = renderer
+        self.__textures = weakref.WeakKeyDictionary()
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    def draw(self, layers: list[Layer]) -> None:
+        if layers == self.__layers:
+            self.skips += 1
+            return
+        self.__layers = list(layers)
+
+        size = self.__renderer.get_viewport().size
+        self.__renderer.draw_color = pygame.Color(self.background_color)
+        self.__renderer.clear()
+        for layer in layers:
+            with self.profiler.stage('draw.' + layer.name):
+                texture = self.__texture(layer)
+                rect = texture.get_rect()
+                rect.size = (
+                    round(rect.w * layer.scale),
+                    round(rect.h * layer.scale),
+                )
+                texture.draw(dstrect=centered(size, rect), angle=layer.angle)
+
+        self.flips += 1
+        with self.profiler.stage('present'):
+            self.__renderer.present()
+
+    @property
+    def nbytes(self) -> int:
+        # textures live with the driver, assume 32 bits per pixel
+        return sum(
+            4 * texture.width * texture.height
+            for texture, _ in list(self.__textures.values())
+        )
+
+    def invalidate(self) -> None:
+        self.__layers = None
+
+    def __texture(self, layer: Layer) -> video.Texture:
+        # surfaces are uploaded once and keep their texture for as long as
+        # they're alive; a new version means the pixels changed in place
+        texture, version = self.__textures.get(layer.surface, (None, None))
+        if texture is None or version != layer.version:
+            texture = video.Texture.from_surface(
+                self.__renderer, layer.surface
+            )
+            texture.blend_mode = BLEND_MODES.get(
+                layer.special_flags, BLENDMODE_BLEND
+            )
+            alpha = layer.surface.get_alpha()
+            texture.alpha = 255 if alpha is None else alpha
+            self.__textures[layer.surface] = (texture, layer.version)
+            self.uploads += 1
+        return texture
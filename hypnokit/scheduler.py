@@ -0,0 +1,157 @@
+import heapq
+import math
+import time
+
+import pygame
+
+from typing import Callable, Optional
+
+
+def monotonic_millis() -> float:
+    return 1000 * time.monotonic()
+
+
+class AudioClock:
+    fallback: Callable[[], float] = staticmethod(monotonic_millis)
+    # get_pos only moves once per mixer buffer, so interpolate up to this
+    resolution: float = 100
+
+    __now: float = 0
+    __offset: float = 0
+    __position: Optional[int] = None
+    __synced: float = 0
+    __wall: float = 0
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+        self.__now = self.__wall = self.fallback()
+
+    def __call__(self) -> float:
+        # music time while it plays, wall time otherwise, joined up so
+        # the result never jumps or runs backwards
+        wall = self.fallback()
+        position = -1
+        if pygame.mixer.get_init():
+            position = pygame.mixer.music.get_pos()
+        now = self.__now + wall - self.__wall
+        if position < 0:
+            self.__position = None
+        elif self.__position is None or position < self.__position:
+            # music (re)started: carry on from here on its clock
+            self.__position = position
+            self.__synced = wall
+            self.__offset = now - position
+        else:
+            if position != self.__position:
+                self.__position = position
+                self.__synced = wall
+            elapsed = min(wall - self.__synced, self.resolution)
+            now = self.__offset + position + elapsed
+        self.__now = max(self.__now, now)
+        self.__wall = wall
+        return self.__now
+
+
+class Scheduler:
+    clock: Callable[[], float]
+
+    __deadlines: dict[str, float]
+    __heap: list[tuple[float, str]]
+    __periods: dict[str, Optional[float]]
+    __ready: set[str]
+    __wake: set[str]
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = monotonic_millis,
+        **periods: float,
+    ):
+        self.clock = clock
+        self.__deadlines = {}
+        self.__heap = []
+        self.__periods = {}
+        self.__ready = set()
+        self.__wake = set()
+        for key, period in periods.items():
+            self.add(key, period)
+
+    def add(
+        self,
+        key: str,
+        period: float,
+        repeat: bool = True,
+        wake: bool = True,
+    ):
+        if period <= 0:
+            raise ValueError(f'{key} period must be positive')
+        self.__periods[key] = period if repeat else None
+        if wake:
+            self.__wake.add(key)
+        else:
+            self.__wake.discard(key)
+        self.__schedule(key, self.clock() + period)
+
+    def remove(self, key: str):
+        self.__deadlines.pop(key, None)
+        self.__periods.pop(key, None)
+        self.__ready.discard(key)
+        self.__wake.discard(key)
+
+    def delay(self, key: str, millis: float):
+        self.__schedule(key, self.__deadlines[key] + millis)
+
+    def reset(self):
+        now = self.clock()
+        self.__ready.clear()
+        for key, period in self.__periods.items():
+            if period is not None:
+                self.__schedule(key, now + period)
+
+    def restart(self, key: str):
+        self.__ready.discard(key)
+        self.schedule(key, self.__periods[key])
+
+    def schedule(self, key: str, millis: float):
+        self.__schedule(key, self.clock() + millis)
+
+    def trigger(self, key: str):
+        self.__ready.add(key)
+
+    def is_ready(self, key: str) -> bool:
+        return key in self.__ready
+
+    def period(self, key: str) -> Optional[float]:
+        return self.__periods.get(key)
+
+    def pop(self, key: str) -> bool:
+        if key in self.__ready:
+            self.__ready.remove(key)
+            return True
+        return False
+
+    def next_deadline(self) -> float:
+        return min(
+            (self.__deadlines[key] for key in self.__wake
+             if key in self.__deadlines),
+            default=math.inf,
+        )
+
+    def update(self):
+        now = self.clock()
+        while self.__heap and self.__heap[0][0] <= now:
+            deadline, key = heapq.heappop(self.__heap)
+            if self.__deadlines.get(key) != deadline:
+                continue
+            self.__ready.add(key)
+            period = self.__periods[key]
+            if period is None:
+                del self.__deadlines[key]
+                continue
+            # stay on the original grid, skipping any periods we slept through
+            missed = (now - deadline) // period
+            self.__schedule(key, deadline + (missed + 1) * period)
+
+    def __schedule(self, key: str, deadline: float):
+        self.__deadlines[key] = deadline
+        heapq.heappush(self.__heap, (deadline, key))
@@ -1,18 +1,30 @@
 from itertools import count
 import os
 import sys
+import time
 
 import pygame
-import pyttsx3
-import tones
-import tones.mixer
+from pygame._sdl2 import video
 
+from .assets import AssetCache, Assets
+from .binaural import binaural_sound
+from .cache import sound_bytes
+from .compositor import Compositor, Layer, display_format
 from .images import Images
-from .script import Script
-from .spiral import Spiral
+from .index import shared_index
+from .memory import MEGABYTE, MemoryBudget
+from .profiler import NullProfiler, Profiler
+from .recorder import RecordedSpeech, Recorder
+from .renderer import TextureCompositor
+from .scheduler import AudioClock, Scheduler
+from .script import Script, ScriptState
+from .speech import SPEECH_END, SPEECH_READY, Speech
+from .spiral import PaletteSpiral, RotatingSpiral, Spiral
+from .startup import Startup
+from .text import TextCache
 from .types import Size
 
-from typing import Iterator
+from typing import Iterator, Optional
 
 
 os.environ['SDL_VIDEO_CENTERED'] = '1'
@@ -22,13 +34,42 @@ AUDIO_END = pygame.USEREVENT+1
 pygame.mixer.music.set_endevent(AUDIO_END)
 pygame.mixer.pre_init(buffer=4096)
 
+# surface blits onto the display, or textures through an SDL renderer,
+# optionally forced onto the software one
+BACKENDS = ('surface', 'renderer', 'software')
+
 BINAURAL_DEFAULTS = {
     'frequency': 10,  # very low pitch
     'wavelength': 8,  # both theta and alpha wave stimulating
     'volume': 0.75,
 }
 
+SPIRAL_MODES = {
+    'frames': Spiral,
+    'palette': PaletteSpiral,
+    'rotate': RotatingSpiral,
+}
+
+# longest we'll block on the event queue while nothing is animating
+IDLE_TIMEOUT = 1000
+
+MEMORY_DEFAULTS = {
+    'budget': 1024,  # megabytes
+    'log': 0,  # seconds between usage lines on stderr, 0 for none
+}
+
+# how often usage is checked against the budget
+MEMORY_CHECK = 1000
+
+# how far into the script startup looks for what to wait for
+STARTUP_HORIZON = 5000
+# how often the progress screen checks on startup
+STARTUP_POLL = 50
+
 TICKER_DEFAULTS = {
+    # or 'audio', to follow the music's playback position, or 'frames', to
+    # step a frame period at a time as fast as frames render
+    'clock': 'system',
     'action': 500,
     'image': 1000,
     'spiral': 1,
@@ -42,9 +83,12 @@ TTS_DEFAULTS = {
 
 
 class Screen:
+    backend: str = 'surface'
     background_color: str = "black"
     frames_per_second: int = 60
     fullscreen: bool = False
+    reload: int = 1000  # ms between checks for script changes, 0 to disable
+    resize_delay: int = 250
     text_color = (0, 51, 204)
     text_alpha: int = 254
     text_font: pygame.font.Font = None
@@ -57,43 +101,83 @@ class Screen:
     running: bool = False
     text: str = ""
 
+    __assets: AssetCache
     __binaural_channel: pygame.mixer.Channel
-    __images: dict[Size, Iterator[pygame.Surface]]
+    __compositor: Compositor | TextureCompositor
+    __memory: MemoryBudget
+    __music_length: Optional[float]
+    __profiler: Profiler
+    __recorder: Optional[Recorder]
     __script: Script
-    __speech_engine: pyttsx3.Engine
-    __spirals: dict[Size, Iterator[pygame.Surface]]
-    __ticker: 'Ticker'
-
-    def __init__(self, script: Script):
+    __speech: Speech | RecordedSpeech
+    __startup: Startup
+    __text_cache: TextCache
+    __ticker: Scheduler
+    __window: Optional[video.Window]
+
+    def __init__(
+        self,
+        script: Script,
+        profile: Optional[str] = None,
+        recorder: Optional[Recorder] = None,
+    ):
         self.__script = script
+        self.__recorder = recorder
+        self.__binaural = None
         self.__binaural_channel = None
-        self.__images = {}
-        self.__spirals = {}
+        self.__events = []
+        self.__action_index = 0
+        self.__frame_count = 0
+        self.__simulated = False
+        self.__image_size = None
+        self.__music_length = None
+        self.__spiral = None
+        self.__spiral_size = None
+        self.__text_cache = TextCache()
+        self.__window = None
 
         for key, value in (script.options.get('screen') or {}).items():
             if key == 'size':
                 self.size = self.windowed_size = Size(*value)
             elif hasattr(self, key):
                 setattr(self, key, value)
-
-        for key, value in script.options.get('text', {}).items():
-            if key == 'alpha':
-                self.text_alpha = value
-            elif key == 'color':
-                self.text_color = pygame.color.Color(value)
-
+        if self.backend not in BACKENDS:
+            raise ValueError(f'unknown screen backend: {self.backend!r}')
+        if recorder is not None:
+            # frames are read back from the display surface
+            self.backend = 'surface'
+            self.fullscreen = False
+
+        self.__init_text()
+        self.__script_mtime = self.__script_stat()
+
+        self.__init_profiler(profile)
+        self.__init_memory()
         pygame.init()
         self.__init_screen()
         self.__init_fonts()
         self.__loading()
-        self.__init_audio()
-        self.__init_images()
-        self.__init_spirals()
         self.__init_ticker()
-        self.__init_tts()
+        with self.__profiler.stage('init.tts'):
+            self.__init_tts()
+        self.__init_startup()
 
     def enable_binaural(self, enabled=True):
         opts = self.__script.options.get('binaural', BINAURAL_DEFAULTS)
+        if self.__recorder is not None:
+            opts = {**BINAURAL_DEFAULTS, **opts}
+            if enabled:
+                self.__recorder.play(
+                    'binaural',
+                    ('binaural', opts['frequency'], opts['wavelength']),
+                    volume=opts['volume'],
+                    loop=True,
+                )
+            else:
+                self.__recorder.stop('binaural')
+            return
+        if enabled:
+            self.__startup.wait('binaural')
         already_enabled = (
             self.__binaural_channel is not None and
             self.__binaural_channel.get_busy()
@@ -106,111 +190,200 @@ class Screen:
             self.__binaural_channel.stop()
             self.__binaural_channel = None
 
-    def enable_music(self, enabled=True):
+    def enable_music(self, enabled=True, start: float = 0.0):
         opts = self.__script.options.get('music', {})
+        if self.__recorder is not None:
+            if enabled and 'path' in opts:
+                self.__recorder.play(
+                    'music',
+                    ('file', self.__script.relative_path(opts['path'])),
+                    volume=opts.get('volume', 1.0),
+                    offset=start,
+                    loop=True,
+                )
+            elif not enabled:
+                self.__recorder.stop('music')
+            return
+        if enabled:
+            self.__startup.wait('music')
         if enabled and not pygame.mixer.music.get_busy():
-            pygame.mixer.music.play(-1)
+            self.__play_music(start)
             if 'volume' in opts:
                 pygame.mixer.music.set_volume(opts['volume'])
         elif not enabled:
             pygame.mixer.music.stop()
-
-    def run(self):
+            # stopping posts the end event too, which would otherwise read
+            # as the track running out and end the session
+            pygame.event.clear(AUDIO_END)
+            self.__events = [e for e in self.__events if e.type != AUDIO_END]
+
+    def run(
+        self,
+        frames: Optional[int] = None,
+        start: Optional[int] = None,
+        start_action: Optional[int] = None,
+    ):
         self.running = True
-        c = pygame.time.Clock()
+        self.__action_held = False
+        with self.__profiler.stage('startup'):
+            self.__start(self.__script.requirements(
+                start, start_action, horizon=STARTUP_HORIZON,
+            ))
+        if not self.running:
+            return
+        self.__ticker.reset()
+        self.__next_frame = self.__ticker.clock()
 
-        self.__actions = iter(self.__script)
+        if start is None and start_action is None:
+            self.__actions = iter(self.__script)
+            self.__action_index = 0
+        else:
+            self.__seek(start, start_action)
         self.__current_action = self.__next_action()
         self.__current_spiral = self.__next_spiral()
-        self.__current_image = self.__next_image()
-
-        for _ in count():
-            elapsed = c.tick(self.frames_per_second)
-            self.__process_events()
-            if not self.running:
-                break
-            self.__update(elapsed)
-            self.__render()
+        # fetched once the script turns images on
+        self.__current_image = None
+
+        try:
+            for frame in count() if frames is None else range(frames):
+                # the first frame replaces the progress screen straight away
+                self.__profiler.frame(self.__wait() if frame else None)
+                with self.__profiler.stage('events'):
+                    self.__process_events()
+                if not self.running:
+                    break
+                with self.__profiler.stage('update'):
+                    self.__update()
+                with self.__profiler.stage('render'):
+                    self.__render()
+                if self.__recorder is not None:
+                    self.__recorder.frame(self.screen)
+                self.__frame_count += 1
+        finally:
+            self.__write_profile()
 
     def set_background_text(self, text: str):
-        lines = text.splitlines()
-        width = 0
-        height = 0
-        for line in lines:
-            w, h = self.background_font.size(line)
-            width = max(width, w)
-            height += h
-        img = pygame.Surface((width, height))
-        img.set_colorkey(self.background_color)
-        height = 0
-        for line in lines:
-            word = self.background_font.render(
-                line, True, color_rotate(self.text_color)
-            )
-            cx, cy = word.get_rect().center
-            x_off = (width/2) - cx
-            y_off = height
-            height += 2 * cy
-            img.blit(word, (int(x_off), int(y_off)))
-        img.set_alpha(int(self.text_alpha / 2))
-        self.background_text = img.convert()
+        key = (
+            'background',
+            text,
+            self.__font_size,
+            tuple(self.text_color),
+            self.text_alpha,
+        )
+        self.background_text = self.__text_cache.get(
+            key, lambda: self.__render_background_text(text)
+        )
 
     def speak(self, text: str):
-        self.__speech_engine.say(text)
+        self.__speech.say(text)
 
     def rest(self, millis: int):
-        self.__ticker.add_millis('action', millis)
+        self.__ticker.delay('action', millis)
 
-    def __display_text(self, text, alpha=None, delay=False):
-        surface = pygame.Surface(self.size)
-        surface.set_colorkey(0)
-        if alpha is None:
-            alpha = self.text_alpha
-        surface.set_alpha(alpha)
-        text = self.text_font.render(text, True, self.text_color, None)
-        text_rect = text.get_rect()
-        text_rect.center = (self.size.x / 2, self.size.y / 2)
-        surface.blit(text, text_rect)
-        self.__draw_surface(surface, delay)
-
-    def __draw_surface(self, surface, delay=False):
-        cx, cy = surface.get_rect().center
-        x_offset = int((self.size.x/2) - cx)
-        y_offset = int((self.size.y/2) - cy)
-        self.screen.blit(surface, (x_offset, y_offset))
-        if not delay:
-            pygame.display.flip()
-
-    def __init_audio(self):
-        self.__speech_engine = None
-        self.__init_binaural()
-        self.__init_music()
+    def __evict(self) -> None:
+        self.__memory.enforce()
+
+    def __evict_assets(self, nbytes: int) -> int:
+        return self.__assets.evict(
+            nbytes, self.size, self.__image_size, self.__spiral_size
+        )
+
+    def __await_assets(self, part: str) -> None:
+        # a spiral raises if its build failed, images may settle for none
+        getattr(self.__startup.result('assets'), part).wait()
 
     def __init_binaural(self):
         binaural_opts = {
             **BINAURAL_DEFAULTS,
             **self.__script.options.get('binaural', {}),
         }
-        frequency = binaural_opts['frequency']
-        wavelength = binaural_opts['wavelength']
-        mixer = tones.mixer.Mixer()
-        mixer.create_track(0, tones.SINE_WAVE)
-        mixer.add_tone(0, frequency=frequency, duration=10)
-        mixer.create_track(1, tones.SINE_WAVE)
-        mixer.add_tone(1, frequency=frequency+wavelength, duration=10)
-        self.__binaural = pygame.mixer.Sound(buffer=mixer.sample_data())
-
-    def __init_images(self):
-        for size in self.__sizes():
-            self.__load_images(size)
+        self.__binaural = binaural_sound(
+            binaural_opts['frequency'],
+            binaural_opts['wavelength'],
+        )
+
+    def __init_index(self):
+        opts = self.__script.options.get('images', {})
+        dir = self.__script.relative_path(opts.get('path', './images'))
+        # the same shared index the images for every size will use
+        shared_index(os.path.abspath(dir), opts.get('cache', True))
+
+    def __init_memory(self):
+        opts = self.__script.options.get('memory', {})
+        if not isinstance(opts, dict):
+            opts = {'budget': opts}
+        opts = {**MEMORY_DEFAULTS, **opts}
+        self.__memory = memory = MemoryBudget(
+            budget=int(opts['budget'] * MEGABYTE),
+            log=opts['log'],
+        )
+        memory.add('images', lambda: sum(
+            assets.images.nbytes for assets in self.__assets
+        ))
+        memory.add('spirals', lambda: sum(
+            assets.spiral.nbytes for assets in self.__assets
+        ))
+        memory.add('text', lambda: self.__text_cache.nbytes)
+        memory.add('compositor', lambda: self.__compositor.nbytes)
+        memory.add('binaural', lambda: (
+            0 if self.__binaural is None else sound_bytes(self.__binaural)
+        ))
+        memory.add('speech', lambda: self.__speech.nbytes)
+        # whole sizes go first, text is cheap to render again
+        memory.add_evictor(self.__evict_assets)
+        memory.add_evictor(self.__text_cache.evict)
 
     def __init_music(self):
         music_opts = self.__script.options.get('music', {})
+        self.__music_length = None
         if 'path' in music_opts:
             path = self.__script.relative_path(music_opts['path'])
             pygame.mixer.music.load(path)
 
+    def __init_profiler(self, path: Optional[str]):
+        opts = self.__script.options.get('profile', False)
+        if path is not None:
+            opts = {'path': path}
+        elif opts is True:
+            opts = {}
+        elif isinstance(opts, str):
+            opts = {'path': self.__script.relative_path(opts)}
+        elif isinstance(opts, dict) and 'path' in opts:
+            opts = {**opts, 'path': self.__script.relative_path(opts['path'])}
+        if opts is False or opts is None:
+            self.__profiler = NullProfiler()
+        else:
+            # deadlines follow the screen unless the profile says otherwise
+            self.__profiler = Profiler(**{
+                'frames_per_second': self.frames_per_second,
+                **opts,
+            })
+
+    def __init_renderer(self):
+        if self.__window is None:
+            self.__window = video.Window(size=self.size, resizable=True)
+            renderer = video.Renderer(
+                self.__window,
+                accelerated=0 if self.backend == 'software' else -1,
+            )
+            self.__compositor = TextureCompositor(
+                renderer,
+                background_color=self.background_color,
+                profiler=self.__profiler,
+            )
+        elif not self.fullscreen:
+            self.__window.set_windowed()
+            self.__window.size = self.size
+        if self.fullscreen:
+            self.__window.set_fullscreen(desktop=True)
+        self.screen = None
+        self.size = Size(*self.__window.size)
+
     def __init_screen(self):
+        if self.backend != 'surface':
+            pygame.mouse.set_visible(not self.fullscreen)
+            self.__init_renderer()
+            return
         if self.fullscreen:
             size = (0, 0)
             flags = pygame.NOFRAME
@@ -220,63 +393,203 @@ class Screen:
         pygame.mouse.set_visible(not self.fullscreen)
         self.screen = pygame.display.set_mode(size, flags)
         self.size = Size(*self.screen.get_size())
-
-    def __init_spirals(self):
-        for size in self.__sizes():
-            self.__load_spiral(size)
+        self.__compositor = Compositor(
+            self.screen,
+            background_color=self.background_color,
+            profiler=self.__profiler,
+        )
 
     def __init_fonts(self):
         fontsize = int(self.size.x/10)
         self.text_font = pygame.font.SysFont(None, fontsize)
         self.background_font = pygame.font.SysFont(None, 3 * fontsize)
+        self.__font_size = fontsize
+        self.__text_cache.clear()
+
+    def __init_startup(self):
+        self.__assets = AssetCache(self.__load_assets)
+        self.__startup = startup = Startup(
+            profiler=self.__profiler,
+            # offline, everything loads in order before the first frame
+            threaded=self.__recorder is None,
+        )
+        startup.add('binaural', self.__init_binaural)
+        startup.add('music', self.__init_music)
+        startup.add('index', self.__init_index)
+        startup.add('assets', lambda: self.__assets.get(self.size), 'index')
+        if self.__recorder is not None:
+            return
+        startup.add('spiral', lambda: self.__await_assets('spiral'), 'assets')
+        startup.add('images', lambda: self.__await_assets('images'), 'assets')
+        # other sizes only once the one on screen has its spiral
+        sizes = self.__sizes()
+        startup.add('sizes', lambda: [
+            self.__assets.prefetch(size) for size in sizes
+        ], 'spiral')
+
+    def __init_text(self):
+        for key, value in self.__script.options.get('text', {}).items():
+            if key == 'alpha':
+                self.text_alpha = value
+            elif key == 'color':
+                self.text_color = pygame.color.Color(value)
 
     def __init_ticker(self):
         opts = {
             **TICKER_DEFAULTS,
             **self.__script.options.get('ticker', {}),
         }
-        self.__ticker = Ticker(**opts)
+        clock = opts.pop('clock')
+        self.__simulated = clock == 'frames'
+        if self.__recorder is not None:
+            self.__ticker = Scheduler(clock=self.__recorder.clock)
+        elif clock == 'audio':
+            self.__ticker = Scheduler(clock=AudioClock())
+        elif clock == 'system':
+            self.__ticker = Scheduler()
+        elif clock == 'frames':
+            if not self.frames_per_second:
+                raise ValueError('a frames clock needs frames_per_second')
+            self.__ticker = Scheduler(clock=self.__frame_clock)
+        else:
+            raise ValueError(f'unknown ticker clock: {clock!r}')
+        self.__ticker.add('action', opts.pop('action'))
+        self.__ticker.add('image', opts.pop('image'))
+        # the spiral only advances when a frame is drawn anyway
+        self.__ticker.add('spiral', opts.pop('spiral'), wake=False)
+        for key, period in opts.items():
+            self.__ticker.add(key, period)
+        self.__ticker.add('memory', MEMORY_CHECK, wake=False)
+        if self.__recorder is None and self.reload:
+            self.__ticker.add('reload', self.reload, wake=False)
 
     def __init_tts(self):
         opts = {
             **TTS_DEFAULTS,
             **self.__script.options.get('tts', {}),
         }
-        self.__speech_engine = pyttsx3.init()
-        self.__speech_engine.startLoop(False)
-        self.__speech_engine.setProperty('voice', opts['voice'])
-        self.__speech_engine.setProperty('volume', opts['volume'])
-        self.__speech_engine.setProperty('rate', opts['rate'])
-
-    def __load_images(self, size: Size) -> None:
-        if size not in self.__images:
-            opts = self.__script.options.get('images', {})
-            dir = self.__script.relative_path(opts.get('path', './images'))
-            self.__images[size] = Images(dir=dir, size=size)
-
-    def __load_spiral(self, size: Size) -> None:
-        if size not in self.__spirals:
-            kwargs = self.__script.options.get('spiral', {})
-            self.__spirals[size] = Spiral(**kwargs, size=size)
-
-    def __loading(self) -> None:
-        self.screen.fill(self.background_color)
-        self.__display_text(
-            'Loading...' if not self.running else 'Reloading...',
-            alpha=255,
+        if self.__recorder is not None:
+            self.__speech = RecordedSpeech(self.__recorder, **opts)
+        else:
+            self.__speech = Speech(**opts)
+        self.__speech.prepare(*self.__script.speech())
+
+    def __load_assets(self, size: Size) -> Assets:
+        return Assets(
+            images=self.__load_images(size),
+            spiral=self.__load_spiral(size),
+        )
+
+    def __load_images(self, size: Size) -> Images:
+        kwargs = dict(self.__script.options.get('images', {}))
+        dir = self.__script.relative_path(kwargs.pop('path', './images'))
+        # offline, the clock waits for images instead of skipping them
+        blocking = self.__recorder is not None
+        return Images(**kwargs, dir=dir, size=size, blocking=blocking)
+
+    def __load_spiral(self, size: Size) -> Iterator[pygame.Surface]:
+        kwargs = dict(self.__script.options.get('spiral', {}))
+        # the renderer rotates a single texture for free
+        default = 'frames' if self.backend == 'surface' else 'rotate'
+        spiral = SPIRAL_MODES[kwargs.pop('mode', default)]
+        if self.__recorder is not None:
+            # export already runs a process per CPU
+            kwargs['parallel'] = False
+        return spiral(**kwargs, size=size)
+
+    def __frame_clock(self) -> float:
+        return 1000 * self.__frame_count / self.frames_per_second
+
+    def __frame_period(self) -> Optional[float]:
+        if not self.enable_spiral:
+            return None
+        return max(
+            1000 / self.frames_per_second,
+            self.__ticker.period('spiral'),
         )
 
+    def __layers(self) -> list[Layer]:
+        layers = []
+        if self.enable_images and self.__current_image is not None:
+            width, height = self.__image_size
+            layers.append(Layer(
+                'image',
+                self.__current_image,
+                scale=max(self.size.x / width, self.size.y / height),
+                static=True,
+            ))
+        if self.background_text:
+            layers.append(Layer(
+                'background',
+                self.background_text,
+                static=True,
+            ))
+        if self.enable_spiral and self.__current_spiral is not None:
+            spiral = self.__spiral
+            layers.append(Layer(
+                'spiral',
+                self.__current_spiral,
+                special_flags=spiral.special_flags,
+                version=spiral.version,
+                angle=spiral.angle,
+                scale=max(*self.size) / max(*self.__spiral_size),
+            ))
+        if self.text:
+            layers.append(Layer('text', self.__text_surface(self.text)))
+        return layers
+
+    def __loading(self, progress: float = 0.0) -> None:
+        self.__compositor.invalidate()
+        self.__compositor.draw([
+            Layer('loading', self.__render_loading(progress)),
+        ])
+
     def __next_action(self):
-        return next(self.__actions)
+        return next(self.__actions, None)
 
-    def __next_image(self):
-        return next(self.__images[self.size])
+    def __nearest_assets(self) -> tuple[Size, Assets]:
+        if self.__recorder is not None:
+            # offline frames mustn't depend on how far a build has got
+            return self.size, self.__assets.get(self.size)
+        return self.__assets.nearest(self.size)
 
-    def __next_spiral(self):
-        return next(self.__spirals[self.size])
+    def __next_image(self):
+        size, assets = self.__nearest_assets()
+        if size != self.__image_size:
+            self.__image_size = size
+            self.__evict()
+        return next(assets.images)
+
+    def __next_spiral(self) -> Optional[pygame.Surface]:
+        if not self.enable_spiral:
+            return None
+        size, assets = self.__nearest_assets()
+        if self.__recorder is None and not assets.spiral.ready:
+            # leave the layer out rather than hold frames up for the build
+            return None
+        if size != self.__spiral_size:
+            self.__spiral_size = size
+            self.__evict()
+        self.__spiral = assets.spiral
+        return next(assets.spiral)
+
+    def __play_music(self, start: float) -> None:
+        if start:
+            # the track loops, so a later pass starts part way through it
+            length = self.__track_length()
+            if length:
+                start %= length
+        try:
+            pygame.mixer.music.play(-1, start=start)
+        except pygame.error as e:
+            # not every format can seek
+            print(f'cannot seek music: {e}', file=sys.stderr)
+            pygame.mixer.music.play(-1)
 
     def __process_events(self):
-        for event in pygame.event.get():
+        events = self.__events + pygame.event.get()
+        self.__events = []
+        for event in events:
             if event.type == pygame.QUIT:
                 self.__quit()
             if event.type == AUDIO_END:
@@ -286,15 +599,20 @@ class Screen:
                     self.__toggle_fullscreen()
                 elif event.key == pygame.K_q:
                     self.__quit()
+            elif event.type in (SPEECH_END, SPEECH_READY):
+                self.__speech.handle(event)
+            elif event.type == pygame.WINDOWEXPOSED:
+                self.__compositor.invalidate()
             elif event.type == pygame.WINDOWSIZECHANGED:
                 self.size = Size(event.x, event.y)
                 if not self.fullscreen:
                     self.windowed_size = self.size
-                self.screen.fill(self.background_color)
-                pygame.display.flip()
-                self.__resize()
-                self.__ticker.force_ready('image')
-                self.__ticker.force_ready('spiral')
+                # rebuild once the window settles; until then the nearest
+                # size we already have is scaled to fit
+                self.__compositor.invalidate()
+                self.__ticker.add('resize', self.resize_delay, repeat=False)
+                self.__ticker.trigger('image')
+                self.__ticker.trigger('spiral')
 
     def __quit(self):
         if not self.running:
@@ -303,25 +621,166 @@ class Screen:
             sys.exit()
         self.running = False
 
+    def __render_background_text(self, text: str) -> pygame.Surface:
+        lines = text.splitlines()
+        width = 0
+        height = 0
+        for line in lines:
+            w, h = self.background_font.size(line)
+            width = max(width, w)
+            height += h
+        img = pygame.Surface((width, height))
+        img.set_colorkey(self.background_color)
+        height = 0
+        for line in lines:
+            word = self.background_font.render(
+                line, True, color_rotate(self.text_color)
+            )
+            cx, cy = word.get_rect().center
+            x_off = (width/2) - cx
+            y_off = height
+            height += 2 * cy
+            img.blit(word, (int(x_off), int(y_off)))
+        img.set_alpha(int(self.text_alpha / 2))
+        return display_format(img)
+
+    def __render_loading(self, progress: float) -> pygame.Surface:
+        text = self.text_font.render('Loading...', True, self.text_color)
+        width, height = text.get_size()
+        bar = max(2, height // 10)
+        surface = pygame.Surface((width, height + 2 * bar))
+        surface.set_colorkey(0)
+        surface.blit(text, (0, 0))
+        surface.fill(
+            self.text_color,
+            (0, height + bar, round(width * progress), bar),
+        )
+        return display_format(surface)
+
+    def __render_text(self, text: str, alpha: int) -> pygame.Surface:
+        text = self.text_font.render(text, True, self.text_color, None)
+        surface = pygame.Surface(text.get_size())
+        surface.set_colorkey(0)
+        surface.set_alpha(alpha)
+        surface.blit(text, (0, 0))
+        return display_format(surface)
+
+    def __reload(self, script: Script):
+        old = self.__script.options
+        new = script.options
+
+        def changed(key: str) -> bool:
+            return old.get(key) != new.get(key)
+
+        self.__script = script
+        if changed('memory'):
+            self.__init_memory()
+        if changed('text'):
+            self.__init_text()
+            self.__text_cache.clear()
+        if changed('binaural'):
+            self.enable_binaural(False)
+            self.__init_binaural()
+        if changed('music'):
+            self.enable_music(False)
+            self.__init_music()
+        images = changed('images')
+        spiral = changed('spiral')
+        if images or spiral:
+            self.__assets.replace(
+                lambda size, assets:
+                    self.__reload_assets(size, assets, images, spiral)
+            )
+        if changed('ticker'):
+            self.__init_ticker()
+            self.__ticker.reset()
+        if changed('tts'):
+            self.__speech.close()
+            self.__init_tts()
+        else:
+            self.__speech.prepare(*script.speech())
+
+        # pick up from the same action in the new script
+        self.__compositor.invalidate()
+        self.__seek(None, self.__action_index)
+        self.__current_action = self.__next_action()
+        self.__current_spiral = self.__next_spiral()
+        self.__current_image = None
+
+    def __reload_assets(
+        self,
+        size: Size,
+        assets: Assets,
+        images: bool,
+        spiral: bool,
+    ) -> Assets:
+        if images:
+            assets.images.close()
+            assets = assets._replace(images=self.__load_images(size))
+        if spiral:
+            assets = assets._replace(spiral=self.__load_spiral(size))
+        return assets
+
+    def __reload_script(self):
+        mtime = self.__script_stat()
+        if mtime is None or mtime == self.__script_mtime:
+            return
+        self.__script_mtime = mtime
+        try:
+            script = Script.load(self.__script.filename)
+        except Exception as e:
+            # a half-saved or broken edit shouldn't end the session
+            print(f'reload failed: {e}', file=sys.stderr)
+            return
+        with self.__profiler.stage('reload'):
+            self.__reload(script)
+
     def __render(self) -> None:
-        if self.__speech_engine.isBusy():
-            self.__speech_engine.iterate()
-        self.screen.fill(self.background_color)
-        if self.enable_images:
-            self.__draw_surface(self.__current_image, delay=True)
-        if self.background_text:
-            self.__draw_surface(self.background_text, delay=True)
-        if self.enable_spiral:
-            self.__draw_surface(self.__current_spiral, delay=True)
-        if self.text:
-            self.__display_text(self.text, delay=True)
-        pygame.display.flip()
+        self.__compositor.draw(self.__layers())
 
     def __resize(self):
-        self.__loading()
+        self.__compositor.invalidate()
         self.__init_fonts()
-        self.__load_images(self.size)
-        self.__load_spiral(self.size)
+        self.__assets.get(self.size)
+        self.__evict()
+
+    def __seek(self, millis: Optional[int], index: Optional[int]):
+        self.__actions, state = self.__script.seek(millis, index)
+        self.enable_images = state.enable_images
+        self.enable_spiral = state.enable_spiral
+        self.__action_index = state.index
+        self.enable_binaural(state.binaural)
+        if state.music:
+            elapsed = millis if millis is not None else state.elapsed
+            offset = elapsed - state.music_started
+            self.enable_music(start=offset / 1000)
+        else:
+            self.enable_music(False)
+        if state.background_text is not None:
+            self.set_background_text(state.background_text)
+        self.text = state.text
+        if millis is not None:
+            self.__ticker.schedule('action', state.elapsed - millis)
+        if self.__recorder is not None and millis is not None:
+            self.__seek_spiral(state, millis)
+
+    def __seek_spiral(self, state: ScriptState, millis: int):
+        # an export segment picks the spiral up where the one before it
+        # left off, which is one tick per frame drawn while it was on
+        shown = state.spiral_millis
+        if state.enable_spiral:
+            shown -= state.elapsed - millis
+        period = max(
+            1000 / self.__recorder.frames_per_second,
+            self.__ticker.period('spiral'),
+        )
+        self.__assets.get(self.size).spiral.seek(round(shown / period))
+
+    def __script_stat(self) -> Optional[int]:
+        try:
+            return os.stat(self.__script.filename).st_mtime_ns
+        except OSError:
+            return None
 
     def __sizes(self):
         return (
@@ -330,6 +789,49 @@ class Screen:
             *(Size(*size) for size in pygame.display.get_desktop_sizes()),
         )
 
+    def __start(self, needed: set[str]) -> None:
+        # show progress until whatever the opening actions use is ready,
+        # everything else carries on loading behind the session
+        if self.__recorder is not None:
+            return
+        needed = ['assets', *sorted(needed)]
+        finished = None
+        while self.running and not self.__startup.done(*needed):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (
+                    event.type == pygame.KEYDOWN and event.key == pygame.K_q
+                ):
+                    self.__quit()
+                else:
+                    self.__events.append(event)
+            if finished != self.__startup.finished:
+                finished = self.__startup.finished
+                self.__loading(finished / len(self.__startup))
+            time.sleep(STARTUP_POLL / 1000)
+        if self.running:
+            # raises here if something the session needs failed to load
+            self.__startup.wait(*needed)
+
+    def __track_length(self) -> Optional[float]:
+        # the music module can't tell, so decode the file once to find out
+        if self.__music_length is None:
+            path = self.__script.relative_path(
+                self.__script.options['music']['path']
+            )
+            try:
+                self.__music_length = pygame.mixer.Sound(path).get_length()
+            except pygame.error:
+                self.__music_length = 0
+        return self.__music_length
+
+    def __text_surface(self, text: str, alpha: int = None) -> pygame.Surface:
+        if alpha is None:
+            alpha = self.text_alpha
+        key = (text, self.__font_size, tuple(self.text_color), alpha)
+        return self.__text_cache.get(
+            key, lambda: self.__render_text(text, alpha)
+        )
+
     def __toggle_fullscreen(self):
         self.fullscreen = not self.fullscreen
         if not self.fullscreen:
@@ -337,49 +839,93 @@ class Screen:
         self.__init_screen()
         self.__resize()
 
-    def __update(self, millis: int) -> None:
-        self.__ticker.update(millis)
-
+    def __wait(self) -> Optional[float]:
         if (
-            not self.__speech_engine.isBusy()
-            and self.__ticker.is_ready('action')
+            not self.frames_per_second
+            or self.__recorder is not None
+            or self.__simulated
         ):
-            if self.__current_action:
-                self.__current_action(screen=self)
-            try:
-                self.__current_action = self.__next_action()
-            except StopIteration:
-                self.__current_action = None
-
-        if self.__ticker.is_ready('spiral'):
-            self.__current_spiral = self.__next_spiral()
-
-        if self.enable_images and self.__ticker.is_ready('image'):
-            self.__current_image = self.__next_image()
+            return None
+        now = self.__ticker.clock()
+        period = self.__frame_period()
+        if period is None:
+            self.__wait_for_event(self.__ticker.next_deadline() - now)
+            return None
+        if self.__next_frame <= now:
+            self.__next_frame = max(self.__next_frame + period, now)
+        wake = min(self.__next_frame, self.__ticker.next_deadline())
+        if wake > now:
+            time.sleep((wake - now) / 1000)
+        return period
+
+    def __wait_for_event(self, timeout: float):
+        timeout = min(timeout, IDLE_TIMEOUT)
+        if timeout < 1:
+            return
+        event = pygame.event.wait(int(timeout))
+        if event.type != pygame.NOEVENT:
+            self.__events.append(event)
+
+    def __write_profile(self):
+        assets = self.__assets.peek(self.__image_size)
+        images = assets.images if assets is not None else None
+        self.__profiler.write(
+            assets={
+                'sizes': len(self.__assets),
+                'bytes': self.__assets.nbytes,
+                'evictions': self.__assets.evictions,
+            },
+            memory={
+                **self.__memory.usage(),
+                'budget': self.__memory.budget,
+                'freed': self.__memory.freed,
+            },
+            compositor={
+                'composites': self.__compositor.composites,
+                'flips': self.__compositor.flips,
+                'skips': self.__compositor.skips,
+                'updates': self.__compositor.updates,
+            },
+            images={
+                'depth': images.depth if images else 0,
+                'hits': images.hits if images else 0,
+                'misses': images.misses if images else 0,
+            },
+        )
 
+    def __update(self) -> None:
+        self.__ticker.update()
 
-class Ticker:
-    __frequencies: dict[str, int]
-    __counters: dict[str, int]
+        if self.__ticker.pop('memory'):
+            self.__memory.update()
 
-    def __init__(self, **frequencies: dict[str, int]):
-        self.__frequencies = frequencies
-        self.__counters = frequencies.copy()
+        if self.__ticker.pop('reload'):
+            self.__reload_script()
 
-    def update(self, millis: int):
-        for k in self.__counters:
-            if self.is_ready(k):
-                self.__counters[k] = self.__frequencies[k]
-            self.__counters[k] -= millis
+        if self.__ticker.pop('resize'):
+            self.__resize()
 
-    def is_ready(self, key: str) -> bool:
-        return self.__counters[key] <= 0
+        if self.__speech.busy:
+            self.__action_held |= self.__ticker.pop('action')
+        elif self.__action_held or self.__ticker.pop('action'):
+            if self.__action_held:
+                # start a fresh period from the end of the speech
+                self.__ticker.restart('action')
+                self.__action_held = False
+            if self.__current_action:
+                with self.__profiler.stage('action'):
+                    self.__current_action(screen=self)
+                self.__action_index += 1
+            self.__current_action = self.__next_action()
 
-    def force_ready(self, key: str):
-        self.__counters[key] = 1
+        if self.__ticker.pop('spiral'):
+            self.__current_spiral = self.__next_spiral()
 
-    def add_millis(self, key: str, millis: int):
-        self.__counters[key] += millis
+        if self.enable_images and (
+            self.__ticker.pop('image') or self.__current_image is None
+        ):
+            with self.__profiler.stage('image'):
+                self.__current_image = self.__next_image()
 
 
 def color_rotate(color):
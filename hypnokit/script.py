@@ -1,114 +1,481 @@
 from abc import ABCMeta, abstractmethod
-import itertools
+import hashlib
 import os
 import yaml
 
 from typing import (
     Any,
     Iterator,
+    NamedTuple,
+    Optional,
     TYPE_CHECKING,
 )
+from .cache import load_marshal, save_marshal
 if TYPE_CHECKING:
     from .screen import Screen
 
+try:
+    from yaml import CSafeLoader as Loader
+except ImportError:
+    from yaml import SafeLoader as Loader
+
+
+CACHE_VERSION = 1
+
+
+EMIT = 0
+JUMP = 1
+LOOP = 2
+NEXT = 3
+CALL = 4
+RETURN = 5
+HALT = 6
+
+
+class ScriptError(Exception):
+    pass
+
+
+class Instruction(NamedTuple):
+    op: int
+    arg: Any = None
+
+
+class Program:
+    code: list[Instruction]
+
+    def __init__(self):
+        self.code = []
+
+    def __len__(self) -> int:
+        return len(self.code)
+
+    def emit(self, op: int, arg: Any = None) -> int:
+        self.code.append(Instruction(op, arg))
+        return len(self.code) - 1
+
+    def emits(self, start: int, end: int) -> bool:
+        # whether anything from start up to end, or anything it calls,
+        # gets as far as an EMIT
+        pending = [start]
+        seen = set()
+        while pending:
+            pc = pending.pop()
+            if pc == end or pc in seen:
+                continue
+            seen.add(pc)
+            op, arg = self.code[pc]
+            if op == EMIT:
+                return True
+            elif op in (JUMP, NEXT, CALL):
+                pending.append(arg)
+            if op not in (JUMP, RETURN, HALT):
+                pending.append(pc + 1)
+        return False
+
+    def is_finite(self, address: int = 0) -> bool:
+        pending = [address]
+        seen = set()
+        while pending:
+            pc = pending.pop()
+            if pc in seen:
+                continue
+            seen.add(pc)
+            op, arg = self.code[pc]
+            if op == JUMP and arg <= pc:
+                return False
+            elif op in (JUMP, NEXT, CALL):
+                pending.append(arg)
+            if op not in (JUMP, RETURN, HALT):
+                pending.append(pc + 1)
+        return True
+
+    def patch(self, address: int, arg: Any):
+        self.code[address] = self.code[address]._replace(arg=arg)
+
+
+class Interpreter:
+    __calls: list[int]
+    __loops: list[int]
+    __pc: int
+    __program: Program
+
+    def __init__(self, program: Program, address: int = 0):
+        self.__program = program
+        self.__pc = address
+        self.__calls = []
+        self.__loops = []
 
-class Script:
-    __iter: Iterator = None
+    def __iter__(self):
+        return self
 
-    actions: list[Any]
-    options: dict[str, Any]
+    def __next__(self):
+        code = self.__program.code
+        while True:
+            op, arg = code[self.__pc]
+            self.__pc += 1
+            if op == EMIT:
+                return arg
+            elif op == JUMP:
+                self.__pc = arg
+            elif op == LOOP:
+                self.__loops.append(arg)
+            elif op == NEXT:
+                self.__loops[-1] -= 1
+                if self.__loops[-1] > 0:
+                    self.__pc = arg
+                else:
+                    self.__loops.pop()
+            elif op == CALL:
+                self.__calls.append(self.__pc)
+                self.__pc = arg
+            elif op == RETURN and self.__calls:
+                self.__pc = self.__calls.pop()
+            else:
+                self.__pc -= 1
+                raise StopIteration
+
+
+class Compiler:
+    __callees: dict[Optional[str], set[str]]
+    __caller: Optional[str] = None
+    __calls: list[tuple[int, str]]
+    __forever: list[int]
+    __groups: list[
+        tuple['GroupAction', list[str], list[Any], Optional[str]]
+    ]
+    __path: list[str]
+    __program: Program
+    __subroutines: dict[str, list[Any]]
+
+    def __init__(self, subroutines: dict[str, list[Any]]):
+        self.__callees = {}
+        self.__calls = []
+        self.__forever = []
+        self.__groups = []
+        self.__path = []
+        self.__program = Program()
+        self.__subroutines = subroutines or {}
+
+    def compile(self, actions: list[Any]) -> Program:
+        self.__block(['actions'], actions)
+        self.__program.emit(HALT)
+
+        addresses = {}
+        for name, actions in self.__subroutines.items():
+            addresses[name] = len(self.__program)
+            self.__caller = name
+            self.__block(['subroutines', name], actions)
+            self.__program.emit(RETURN)
+
+        while self.__groups:
+            group, path, actions, self.__caller = self.__groups.pop(0)
+            group.address = len(self.__program)
+            self.__block(path, actions)
+            self.__program.emit(RETURN)
+
+        self.__check_recursion()
+        for address, name in self.__calls:
+            self.__program.patch(address, addresses[name])
+
+        for address in self.__forever:
+            start = self.__program.code[address].arg
+            if not self.__program.emits(start, address):
+                # like cycling an empty list, a loop of nothing just ends
+                self.__program.patch(address, address + 1)
+        return self.__program
+
+    def __block(self, path: list[str], actions: list[Any]):
+        self.__path.extend(path)
+        if not isinstance(actions, list):
+            self.__error('expected a list of actions')
+        for i, action in enumerate(actions):
+            self.__path.append(f'[{i}]')
+            self.__action(action)
+            self.__path.pop()
+        del self.__path[-len(path):]
+
+    def __action(self, action: Any):
+        if not isinstance(action, dict) or len(action) != 1:
+            self.__error(f'expected a single action, got {action!r}')
+        name, arg = next(iter(action.items()))
+        fn = getattr(self, f'_{name}', None)
+        if fn is None:
+            self.__error(f'unknown action {name!r}')
+        self.__path.append(name)
+        try:
+            fn(*arg) if isinstance(arg, list) else fn(arg)
+        except TypeError:
+            self.__error(f'invalid arguments {arg!r}')
+        self.__path.pop()
+
+    def __check_recursion(self):
+        # nothing is conditional, so a subroutine that reaches itself
+        # again never returns
+        for name in self.__subroutines:
+            pending = list(self.__callees.get(name, ()))
+            seen = set()
+            while pending:
+                callee = pending.pop()
+                if callee == name:
+                    self.__path = ['subroutines', name]
+                    self.__error('calls itself, so it would never return')
+                if callee not in seen:
+                    seen.add(callee)
+                    pending.extend(self.__callees.get(callee, ()))
+
+    def __emit(self, action: Any):
+        self.__program.emit(EMIT, action)
+
+    def __error(self, message: str):
+        path = '.'.join(self.__path).replace('.[', '[')
+        raise ScriptError(f'{path}: {message}')
+
+    def __expect(self, value: Any, *types: type):
+        if not isinstance(value, types):
+            names = ' or '.join(t.__name__ for t in types)
+            self.__error(f'expected {names}, got {value!r}')
+
+    def _background_text(self, text: str):
+        self.__expect(text, str, type(None))
+        self.__emit(BackgroundTextAction(text))
+
+    def _binaural(self, enabled: bool):
+        self.__expect(enabled, bool)
+        self.__emit(EnableBinauralAction(enabled))
+
+    def _call(self, name: str):
+        if name not in self.__subroutines:
+            self.__error(f'unknown subroutine {name!r}')
+        self.__calls.append((self.__program.emit(CALL), name))
+        self.__callees.setdefault(self.__caller, set()).add(name)
+
+    def _group(self, *actions):
+        group = GroupAction(self.__program)
+        self.__emit(group)
+        self.__groups.append(
+            (group, [*self.__path], list(actions), self.__caller)
+        )
 
-    @classmethod
-    def load(cls, filename):
-        with open(filename, 'r') as f:
-            data = yaml.load(f, Loader=yaml.Loader)
-        return cls(filename, data)
+    def _images(self, enabled: bool):
+        self.__expect(enabled, bool)
+        self.__emit(EnableImagesAction(enabled))
+
+    def _music(self, enabled: bool):
+        self.__expect(enabled, bool)
+        self.__emit(EnableMusicAction(enabled))
+
+    def _repeat(self, opts: dict[str, Any]):
+        self.__expect(opts, dict)
+        times = opts.get('times')
+        if times is None:
+            start = len(self.__program)
+            self.__block(['actions'], opts.get('actions', []))
+            self.__forever.append(self.__program.emit(JUMP, start))
+            return
+        self.__expect(times, int)
+        if times <= 0:
+            return
+        self.__program.emit(LOOP, times)
+        start = len(self.__program)
+        self.__block(['actions'], opts.get('actions', []))
+        self.__program.emit(NEXT, start)
+
+    def _rest(self, milliseconds: int):
+        self.__expect(milliseconds, int, float)
+        self.__emit(RestAction(milliseconds))
+
+    def _speak(self, text: str):
+        self.__expect(text, str)
+        self.__emit(SpeakAction(text))
+
+    def _spiral(self, enabled: bool):
+        self.__expect(enabled, bool)
+        self.__emit(EnableSpiralAction(enabled))
+
+    def _word(self, word: str, repeat: int = 1):
+        self.__expect(word, str, type(None))
+        self.__expect(repeat, int)
+        action = WordAction(word)
+        for _ in range(repeat):
+            self.__emit(action)
+        self.__emit(BLANK)
 
-    def __init__(self, filename, data):
-        self.filename = filename
-        self.data = data
-        self.actions = iter(data.get('actions', []))
-        self.options = data.get('options', {})
-        self.subroutines = data.get('subroutines', {})
+    def _words(self, words: str):
+        self.__expect(words, str)
+        for word in words.split():
+            self.__emit(WordAction(word))
+        self.__emit(BLANK)
 
-    def __iter__(self):
-        return self
 
-    def __next__(self):
-        if self.__iter:
-            try:
-                return next(self.__iter)
-            except StopIteration:
-                self.__iter = None
-                pass
+class ScriptState:
+    action_millis: int = 500
+    speech_rate: int = 150
 
-        action = next(self.actions)
-        name, arg = next(iter(action.items()))
-        fn = getattr(self, name)
-        self.__iter = iter(fn(*arg) if isinstance(arg, list) else fn(arg))
-        return next(self.__iter)
+    background_text: Optional[str] = None
+    binaural: bool = False
+    elapsed: int = 0
+    enable_images: bool = False
+    enable_spiral: bool = False
+    index: int = 0
+    music: bool = False
+    music_started: Optional[int] = None
+    spiral_millis: int = 0  # how long the spiral has been on
+    text: str = ""
 
-    def background_text(self, text: str):
-        yield BackgroundTextAction(text)
+    __rest: int = 0
+    __speech: int = 0
 
-    def binaural(self, enabled: bool):
-        yield EnableBinauralAction(enabled)
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+        self.elapsed = self.action_millis
 
-    def call(self, name):
-        actions = self.subroutines[name]
-        for action in self.__with_actions(actions):
-            yield action
+    def enable_binaural(self, enabled=True):
+        self.binaural = enabled
 
-    def group(self, *actions):
-        script = self.__with_actions(actions)
-        yield GroupAction(script)
+    def enable_music(self, enabled=True):
+        if enabled and not self.music:
+            self.music_started = self.elapsed
+        self.music = enabled
 
-    def music(self, enabled: bool):
-        yield EnableMusicAction(enabled)
+    def rest(self, millis: int):
+        self.__rest += millis
 
-    def relative_path(self, path: str):
-        dir = os.path.dirname(self.filename)
-        return os.path.normpath(os.path.join(dir, path))
+    def set_background_text(self, text: str):
+        self.background_text = text
 
-    def rest(self, milliseconds):
-        yield RestAction(milliseconds)
+    def speak(self, text: str):
+        words = len(text.split())
+        self.__speech += int(60000 * words / self.speech_rate)
+
+    def requirements(self) -> set[str]:
+        return {
+            name for name, used in (
+                ('binaural', self.binaural),
+                ('images', self.enable_images),
+                ('music', self.music),
+                ('spiral', self.enable_spiral),
+            ) if used
+        }
+
+    def step(self, action):
+        self.__rest = self.__speech = 0
+        action(self)
+        self.index += 1
+        millis = max(self.action_millis + self.__rest, self.__speech)
+        if self.enable_spiral:
+            self.spiral_millis += millis
+        self.elapsed += millis
 
-    def images(self, enabled: bool):
-        yield EnableImagesAction(enabled)
 
-    def repeat(self, opts):
-        actions = opts.get('actions', [])
-        if 'times' in opts:
-            iter = itertools.chain(*(
-                self.__with_actions(actions)
-                for _ in range(opts['times'])
-            ))
+class Script:
+    actions: list[Any]
+    options: dict[str, Any]
+    program: Program
+
+    @classmethod
+    def load(cls, filename, cache: bool = True):
+        dir, name = os.path.split(filename)
+        cache_path = os.path.join(dir, f'.{name}.cache')
+        stat = os.stat(filename)
+        cached = load_marshal(cache_path) if cache else None
+        if not (
+            isinstance(cached, tuple) and len(cached) == 5
+            and cached[0] == CACHE_VERSION
+        ):
+            cached = None
+        if cached and cached[1:3] == (stat.st_mtime_ns, stat.st_size):
+            return cls(filename, cached[4])
+
+        with open(filename, 'rb') as f:
+            source = f.read()
+        digest = hashlib.sha256(source).hexdigest()
+        if cached and cached[3] == digest:
+            script = cls(filename, cached[4])
         else:
-            iter = itertools.cycle(self.__with_actions(actions))
-        for action in iter:
-            yield action
-
-    def __with_actions(self, actions):
-        return Script(
-            filename=self.filename,
-            data={**self.data, 'actions': actions},
-        )
+            script = cls(filename, yaml.load(source, Loader=Loader))
+        if cache:
+            save_marshal(cache_path, (
+                CACHE_VERSION,
+                stat.st_mtime_ns,
+                stat.st_size,
+                digest,
+                script.data,
+            ))
+        return script
 
-    def speak(self, text: str):
-        yield SpeakAction(text)
+    def __init__(self, filename, data):
+        self.filename = filename
+        self.data = data
+        self.actions = data.get('actions', [])
+        self.options = data.get('options', {})
+        self.subroutines = data.get('subroutines', {})
+        self.program = Compiler(self.subroutines).compile(self.actions)
 
-    def spiral(self, enabled: bool):
-        yield EnableSpiralAction(enabled)
+    def __iter__(self) -> Iterator:
+        return Interpreter(self.program)
 
-    def word(self, word: str, repeat: int = 1):
-        for _ in range(repeat):
-            yield WordAction(word)
-        yield WordAction("")
+    def duration(self) -> Optional[int]:
+        if not self.program.is_finite():
+            return None
+        _, state = self.seek()
+        return state.elapsed
 
-    def words(self, words: str):
-        for word in words.split():
-            yield WordAction(word)
-        yield WordAction("")
+    def relative_path(self, path: str):
+        dir = os.path.dirname(self.filename)
+        return os.path.normpath(os.path.join(dir, path))
+
+    def speech(self) -> list[str]:
+        return list(dict.fromkeys(
+            arg.text for op, arg in self.program.code
+            if op == EMIT and isinstance(arg, SpeakAction)
+        ))
+
+    def requirements(
+        self,
+        millis: Optional[int] = None,
+        index: Optional[int] = None,
+        horizon: int = 5000,
+    ) -> set[str]:
+        # what the script uses in its first `horizon` ms from a start point
+        if millis is None and index is None:
+            millis = 0
+        actions, state = self.seek(millis, index)
+        needs = state.requirements()
+        until = state.elapsed + horizon
+        for action in actions:
+            if state.elapsed > until:
+                break
+            state.step(action)
+            needs |= state.requirements()
+        return needs
+
+    def seek(
+        self,
+        millis: Optional[int] = None,
+        index: Optional[int] = None,
+    ) -> tuple[Iterator, ScriptState]:
+        state = ScriptState(**self.__timing())
+        actions = iter(self)
+        while (
+            (millis is None or state.elapsed <= millis)
+            and (index is None or state.index < index)
+        ):
+            try:
+                action = next(actions)
+            except StopIteration:
+                break
+            state.step(action)
+        return actions, state
+
+    def __timing(self) -> dict[str, int]:
+        timing = {}
+        if 'action' in self.options.get('ticker', {}):
+            timing['action_millis'] = self.options['ticker']['action']
+        if 'rate' in self.options.get('tts', {}):
+            timing['speech_rate'] = self.options['tts']['rate']
+        return timing
 
 
 class BackgroundTextAction:
@@ -152,13 +519,14 @@ class EnableSpiralAction(EnableAction):
 
 
 class GroupAction:
-    script: Script
+    address: int = None
+    program: Program
 
-    def __init__(self, script):
-        self.script = script
+    def __init__(self, program: Program):
+        self.program = program
 
     def __call__(self, screen: 'Screen'):
-        for action in self.script:
+        for action in Interpreter(self.program, self.address):
             action(screen)
 
 
@@ -190,3 +558,6 @@ class WordAction:
 
     def __call__(self, screen: 'Screen'):
         screen.text = self.word
+
+
+BLANK = WordAction("")
@@ -0,0 +1,148 @@
+import collections
+import itertools
+import os
+import queue
+import sys
+import tempfile
+import threading
+
+import pygame
+import pyttsx3
+
+from typing import Optional
+from .cache import cache_dir, cache_key, sound_bytes
+
+
+SPEECH_END = pygame.USEREVENT+2
+SPEECH_READY = pygame.USEREVENT+3
+
+
+class Speech:
+    rate: int = 150
+    voice: str = None
+    volume: float = 1.0
+
+    __channel: pygame.mixer.Channel
+    __pending: collections.deque[str]
+    __playing: bool = False
+    __queue: queue.PriorityQueue
+    __sounds: dict[str, pygame.mixer.Sound]
+    __thread: threading.Thread
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+        self.__order = itertools.count()
+        self.__pending = collections.deque()
+        self.__queue = queue.PriorityQueue()
+        self.__sounds = {}
+        pygame.mixer.set_reserved(1)
+        self.__channel = pygame.mixer.Channel(0)
+        self.__channel.set_endevent(SPEECH_END)
+        self.__thread = threading.Thread(target=self.__work, daemon=True)
+        self.__thread.start()
+
+    @property
+    def busy(self) -> bool:
+        return bool(self.__pending) or self.__playing
+
+    def handle(self, event: pygame.event.Event):
+        if event.type == SPEECH_END:
+            self.__playing = False
+        elif (
+            event.type == SPEECH_READY and self.__pending
+            and event.text == self.__pending[0]
+            and event.text not in self.__sounds
+        ):
+            # it failed to synthesize, so skip it rather than wait forever
+            self.__pending.popleft()
+        self.__play_next()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(map(sound_bytes, list(self.__sounds.values())))
+
+    def close(self):
+        # ahead of anything still queued for synthesis
+        self.__queue.put((-1, next(self.__order), None))
+
+    def prepare(self, *texts: str):
+        for text in texts:
+            self.__request(text, priority=1)
+
+    def say(self, text: str):
+        self.__pending.append(text)
+        self.__request(text, priority=0)
+        self.__play_next()
+
+    def __play_next(self):
+        # one at a time on the reserved channel, in the order they were said
+        if self.__playing or not self.__pending:
+            return
+        text = self.__pending[0]
+        if text in self.__sounds:
+            self.__pending.popleft()
+            self.__playing = True
+            self.__channel.play(self.__sounds[text])
+
+    def __request(self, text: str, priority: int):
+        if text not in self.__sounds:
+            self.__queue.put((priority, next(self.__order), text))
+
+    def __work(self):
+        engine = init_engine(self.voice, self.rate, self.volume)
+        while True:
+            _, _, text = self.__queue.get()
+            if text is None:
+                return
+            if engine and text not in self.__sounds:
+                try:
+                    self.__sounds[text] = pygame.mixer.Sound(synthesize(
+                        engine, text, self.voice, self.rate, self.volume,
+                    ))
+                except Exception as e:
+                    # a dead worker would stall the script on its next speak
+                    print(f'speech failed for {text!r}: {e}', file=sys.stderr)
+            pygame.event.post(pygame.event.Event(SPEECH_READY, text=text))
+
+
+def init_engine(
+    voice: str,
+    rate: int,
+    volume: float,
+) -> Optional[pyttsx3.Engine]:
+    if sys.platform == 'win32':
+        # SAPI is COM based and this may not be the thread that imported it
+        import pythoncom
+        pythoncom.CoInitialize()
+    try:
+        engine = pyttsx3.init()
+    except (ImportError, OSError, RuntimeError) as e:
+        print(f'speech disabled: {e}', file=sys.stderr)
+        return None
+    engine.setProperty('voice', voice)
+    engine.setProperty('volume', volume)
+    engine.setProperty('rate', rate)
+    return engine
+
+
+def synthesize(
+    engine: pyttsx3.Engine,
+    text: str,
+    voice: str,
+    rate: int,
+    volume: float,
+) -> str:
+    key = cache_key(text, voice, rate, volume)
+    path = os.path.join(cache_dir('speech'), key + '.wav')
+    if not os.path.exists(path):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.wav')
+        os.close(fd)
+        try:
+            engine.save_to_file(text, tmp)
+            engine.runAndWait()
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return path
@@ -1,21 +1,49 @@
+import concurrent.futures
+import functools
+import itertools
 import math
+import os
+import sys
 import threading
 
+import numpy
 import pygame
 
-from typing import Iterable, Iterator
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterable, Iterator, Optional
+from .cache import (
+    cache_dir, cache_key, limit_dir, load_surfaces, save_surfaces,
+    surface_bytes,
+)
+from .compositor import display_format
+from .memory import MEGABYTE
+from .pool import shared_pool
 from .types import Size
 
 
+# later builds are for more recently requested sizes, so they go first
+BUILD_ORDER = itertools.count()
+
+
 class Spiral:
     size: Size
 
     alpha: int = 127
+    cache: bool = True
+    cache_limit: int = 2048  # megabytes on disk for spirals of every size
     color: str = "white"
+    # display-format frames take four times the memory and measured no
+    # faster to blit than the 8-bit ones (benchmarks/spiral-converted.yaml)
+    convert: bool = False
+    parallel: bool = True
     range: int = 90
     scale: int = 3
     step: int = 1
 
+    angle: float = 0
+    special_flags: int = 0
+    version: int = 0
+
     __frames: Iterable[pygame.Surface] = None
     __iter: Iterator[pygame.Surface] = None
     __thread: threading.Thread = None
@@ -24,50 +52,383 @@ class Spiral:
         self.size = size
         for key, value in kwargs.items():
             setattr(self, key, value)
+        self.__priority = -next(BUILD_ORDER)
+        frames = self.__load_frames()
+        if frames:
+            self.__frames = [self.__init_frame(frame) for frame in frames]
+            return
         self.__thread = threading.Thread(
             target=self.__init_frames,
             daemon=True,
         )
         self.__thread.start()
 
+    @property
+    def nbytes(self) -> int:
+        return sum(surface_bytes(frame) for frame in self.__frames or ())
+
+    @property
+    def ready(self) -> bool:
+        return self.__frames is not None
+
+    def wait(self) -> None:
+        if self.__thread:
+            self.__thread.join()
+        if not self.ready:
+            raise RuntimeError(f'spiral failed to build at {self.size}')
+
+    def seek(self, ticks: int) -> None:
+        # carry on as if it had already been advanced that many times
+        self.wait()
+        frames = list(self.__frames)
+        self.__iter = iter(frames[ticks % len(frames):])
+
+    def __cache_path(self) -> Optional[str]:
+        if not self.cache:
+            return None
+        key = cache_key('frames', self.size, self.scale, self.range, self.step)
+        return os.path.join(cache_dir('spirals'), key + '.raw')
+
+    def __load_frames(self) -> Optional[list[pygame.Surface]]:
+        path = self.__cache_path()
+        if path and os.path.exists(path):
+            return load_surfaces(path, 'P')
+        return None
+
+    def __init_frame(self, frame: pygame.Surface) -> pygame.Surface:
+        frame = tint(frame, self.color, self.alpha)
+        if self.convert:
+            frame = display_format(frame)
+        return frame
+
     def __init_frames(self):
-        spiral = self.__init_spiral()
-        frames = []
-        for t in range(0, int(self.range/self.step)):
-            frame = pygame.transform.rotate(spiral, -t * self.step)
-            frame.set_alpha(self.alpha)
-            frame.set_colorkey(0)
-            frames.append(frame)
-        self.__frames = frames
-
-    def __init_spiral(self) -> pygame.Surface:
-        size = int(1.2 * max(*self.size))
-        offset = size/2.0
-        spiral = pygame.Surface((size, size)).convert()
-        dots = []
-        for t in range(1, size * self.scale):
-            t *= 0.5 / self.scale
-            x = t * t * math.cos(t)
-            y = t * t * math.sin(t)
-            dots.append((int(x + offset), int(y + offset)))
-        pygame.draw.lines(spiral, self.color, False, dots, 4)
-        spiral.set_colorkey(0)
-        a = pygame.transform.rotate(spiral, 90)
-        b = pygame.transform.rotate(spiral, 180)
-        c = pygame.transform.rotate(spiral, 270)
-        spiral.blits(((a, (0, 0)), (b, (0, 0)), (c, (0, 0))))
-        spiral.set_colorkey(None)
-        return spiral
+        angles = [-t * self.step for t in range(0, int(self.range/self.step))]
+        frames = None
+        if self.parallel:
+            try:
+                frames = self.__rotate_shared(angles)
+            except concurrent.futures.CancelledError:
+                # the pool only shuts down as the process exits, and there's
+                # no one left to use the spiral
+                return
+            except Exception as e:
+                # losing the pool only costs the speed-up
+                print(f'rotating spiral in process: {e!r}', file=sys.stderr)
+        if frames is None:
+            spiral = draw_spiral(self.size, self.scale)
+            frames = [pygame.transform.rotate(spiral, a) for a in angles]
+        path = self.__cache_path()
+        if path:
+            save_surfaces(path, frames, 'P')
+            limit_dir(path, self.cache_limit * MEGABYTE, '.raw')
+        self.__frames = [self.__init_frame(frame) for frame in frames]
+
+    def __rotate_shared(self, angles: list[float]) -> list[pygame.Surface]:
+        side = int(1.2 * max(*self.size))
+        limits = [rotated_limit(side, angle) for angle in angles]
+        offsets = [0, *itertools.accumulate(limits)][:-1]
+        memory = SharedMemory(create=True, size=sum(limits))
+        try:
+            pool = shared_pool()
+            chunk = max(1, math.ceil(len(angles) / (2 * pool.workers)))
+            futures = [
+                pool.submit(
+                    self.__priority,
+                    rotate_into,
+                    memory.name,
+                    self.size,
+                    self.scale,
+                    angles[i:i + chunk],
+                    offsets[i:i + chunk],
+                    limits[i:i + chunk],
+                )
+                for i in range(0, len(angles), chunk)
+            ]
+            sizes = [size for future in futures for size in future.result()]
+            # copied out, since a frame still pointing into the block would
+            # keep it from ever being closed
+            return [
+                copy_frame(memory.buf, offset, size)
+                for offset, size in zip(offsets, sizes)
+            ]
+        finally:
+            memory.close()
+            memory.unlink()
 
     def __iter__(self) -> Iterator[pygame.Surface]:
         return self
 
     def __next__(self) -> pygame.Surface:
         if self.__iter is None:
-            self.__thread.join()
+            if self.__thread:
+                self.__thread.join()
             self.__iter = iter(self.__frames)
         try:
             return next(self.__iter)
         except StopIteration:
             self.__iter = None
             return next(self)
+
+
+class PaletteSpiral:
+    size: Size
+
+    alpha: int = 127
+    cache: bool = True
+    cache_limit: int = 2048  # megabytes on disk for spirals of every size
+    color: str = "white"
+    range: int = 90
+    scale: int = 3
+    step: int = 1
+    width: float = 0.1
+
+    angle: float = 0
+    special_flags: int = pygame.BLEND_RGB_ADD
+    version: int = 0
+
+    __palette: list[pygame.Color] = None
+    __phase: int = 0
+    __surface: pygame.Surface = None
+    __thread: threading.Thread = None
+
+    def __init__(self, size: Size, **kwargs):
+        self.size = size
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+        self.__thread = threading.Thread(
+            target=self.__init_surface,
+            daemon=True,
+        )
+        self.__thread.start()
+
+    @property
+    def nbytes(self) -> int:
+        return surface_bytes(self.__surface) if self.__surface else 0
+
+    @property
+    def phases(self) -> int:
+        # the spiral has four arms, so a quarter turn is a full cycle
+        return max(1, min(256, round(90 / self.step)))
+
+    @property
+    def ready(self) -> bool:
+        return self.__surface is not None
+
+    def wait(self) -> None:
+        if self.__thread:
+            self.__thread.join()
+        if not self.ready:
+            raise RuntimeError(f'spiral failed to build at {self.size}')
+
+    def seek(self, ticks: int) -> None:
+        self.__phase = ticks % self.phases
+
+    def __init_palette(self) -> list[pygame.Color]:
+        color = pygame.color.Color(self.color)
+        dark = pygame.color.Color(0, 0, 0)
+        lit = color.lerp(dark, 1 - self.alpha / 255)
+        band = max(1, round(self.width * self.phases))
+        return [
+            lit if (i + band // 2) % self.phases < band else dark
+            for i in range(self.phases)
+        ]
+
+    def __cache_path(self) -> Optional[str]:
+        if not self.cache:
+            return None
+        key = cache_key('palette', self.size, self.phases)
+        return os.path.join(cache_dir('spirals'), key + '.raw')
+
+    def __load_surface(self) -> Optional[pygame.Surface]:
+        path = self.__cache_path()
+        if path and os.path.exists(path):
+            surfaces = load_surfaces(path, 'P')
+            return surfaces[0] if surfaces else None
+        return None
+
+    def __init_surface(self):
+        self.__palette = self.__init_palette()
+        surface = self.__load_surface()
+        if surface is None:
+            surface = self.__init_indices()
+            path = self.__cache_path()
+            if path:
+                save_surfaces(path, [surface], 'P')
+                limit_dir(path, self.cache_limit * MEGABYTE, '.raw')
+                surface = self.__load_surface() or surface
+        self.__surface = surface
+
+    def __init_indices(self) -> pygame.Surface:
+        size = int(1.2 * max(*self.size))
+        offset = size / 2.0
+        x, y = numpy.ogrid[:size, :size]
+        x = x - offset
+        y = y - offset
+        theta = numpy.arctan2(y, x) - numpy.sqrt(numpy.hypot(x, y))
+        phase = (theta / (math.pi / 2)) % 1.0
+        indices = (phase * self.phases).astype(numpy.uint8)
+        indices[indices >= self.phases] = 0
+        surface = pygame.Surface((size, size), depth=8)
+        pygame.surfarray.blit_array(surface, indices)
+        return surface
+
+    def __iter__(self) -> Iterator[pygame.Surface]:
+        return self
+
+    def __next__(self) -> pygame.Surface:
+        if self.__surface is None:
+            self.__thread.join()
+        n = self.phases
+        k = self.__phase
+        self.__surface.set_palette(
+            self.__palette[n-k:] + self.__palette[:n-k]
+        )
+        self.__phase = (k + 1) % n
+        self.version += 1
+        return self.__surface
+
+
+class RotatingSpiral:
+    size: Size
+
+    alpha: int = 127
+    color: str = "white"
+    range: int = 90
+    scale: int = 3
+    step: int = 1
+
+    angle: float = 0
+    special_flags: int = 0
+    version: int = 0
+
+    __surface: pygame.Surface = None
+    __thread: threading.Thread = None
+
+    def __init__(self, size: Size, **kwargs):
+        self.size = size
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+        self.__thread = threading.Thread(
+            target=self.__init_surface,
+            daemon=True,
+        )
+        self.__thread.start()
+
+    @property
+    def nbytes(self) -> int:
+        return surface_bytes(self.__surface) if self.__surface else 0
+
+    @property
+    def ready(self) -> bool:
+        return self.__surface is not None
+
+    def wait(self) -> None:
+        if self.__thread:
+            self.__thread.join()
+        if not self.ready:
+            raise RuntimeError(f'spiral failed to build at {self.size}')
+
+    def seek(self, ticks: int) -> None:
+        self.angle = (ticks * self.step) % self.range
+
+    def __init_surface(self):
+        spiral = draw_spiral(self.size, self.scale)
+        self.__surface = tint(spiral, self.color, self.alpha)
+
+    def __iter__(self) -> Iterator[pygame.Surface]:
+        return self
+
+    def __next__(self) -> pygame.Surface:
+        if self.__surface is None:
+            self.__thread.join()
+            return self.__surface
+        self.angle = (self.angle + self.step) % self.range
+        return self.__surface
+
+
+def draw_spiral(size: Size, scale: int) -> pygame.Surface:
+    side = int(1.2 * max(*size))
+    offset = side/2.0
+    spiral = pygame.Surface((side, side), depth=8)
+    dots = []
+    for t in range(1, side * scale):
+        t *= 0.5 / scale
+        x = t * t * math.cos(t)
+        y = t * t * math.sin(t)
+        dots.append((int(x + offset), int(y + offset)))
+    pygame.draw.lines(spiral, 1, False, dots, 4)
+    spiral.set_colorkey(0)
+    a = pygame.transform.rotate(spiral, 90)
+    b = pygame.transform.rotate(spiral, 180)
+    c = pygame.transform.rotate(spiral, 270)
+    spiral.blits(((a, (0, 0)), (b, (0, 0)), (c, (0, 0))))
+    spiral.set_colorkey(None)
+    return spiral
+
+
+@functools.lru_cache(maxsize=4)
+def cached_spiral(size: Size, scale: int) -> pygame.Surface:
+    return draw_spiral(size, scale)
+
+
+def rotated_limit(side: int, angle: float) -> int:
+    theta = math.radians(angle)
+    width = math.ceil(side * (abs(math.cos(theta)) + abs(math.sin(theta))))
+    return (width + 2) ** 2
+
+
+def attach_memory(name: str) -> SharedMemory:
+    # the creator unlinks the block, so a worker mustn't have a resource
+    # tracker clean it up (or warn about it) a second time
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        # before Python 3.13 there's no opting out, but spawned workers
+        # report to the creator's tracker, which already has the name and
+        # forgets it when the creator unlinks
+        return SharedMemory(name=name)
+
+
+def rotate_into(
+    name: str,
+    size: Size,
+    scale: int,
+    angles: list[float],
+    offsets: list[int],
+    limits: list[int],
+) -> list[tuple[int, int]]:
+    # runs on a pool worker, writing 8-bit frames straight into the
+    # creator's shared memory
+    memory = attach_memory(name)
+    try:
+        spiral = cached_spiral(size, scale)
+        sizes = []
+        for angle, offset, limit in zip(angles, offsets, limits):
+            frame = pygame.transform.rotate(spiral, angle)
+            data = pygame.image.tobytes(frame, 'P')
+            if len(data) > limit:
+                raise ValueError(f'{frame.get_size()} frame overflows')
+            memory.buf[offset:offset + len(data)] = data
+            sizes.append(frame.get_size())
+        return sizes
+    finally:
+        memory.close()
+
+
+def copy_frame(buffer, offset: int, size: Size) -> pygame.Surface:
+    # straight into the surface's own pixels, which are padded per row
+    width, height = size
+    frame = pygame.Surface(size, depth=8)
+    pixels = numpy.frombuffer(buffer, numpy.uint8, width * height, offset)
+    pygame.surfarray.pixels2d(frame)[...] = pixels.reshape(height, width).T
+    return frame
+
+
+def tint(frame: pygame.Surface, color: str, alpha: int) -> pygame.Surface:
+    frame.set_palette(
+        [pygame.color.Color(0, 0, 0)]
+        + 255 * [pygame.color.Color(color)]
+    )
+    frame.set_alpha(alpha)
+    frame.set_colorkey(0)
+    return frame
@@ -0,0 +1,70 @@
+import concurrent.futures
+import threading
+
+from typing import Any, Callable
+from .profiler import NullProfiler, Profiler
+
+
+class Startup:
+    profiler: Profiler = NullProfiler()
+    threaded: bool = True
+
+    __tasks: dict[str, concurrent.futures.Future]
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+        self.__tasks = {}
+
+    def __len__(self) -> int:
+        return len(self.__tasks)
+
+    @property
+    def finished(self) -> int:
+        return sum(task.done() for task in self.__tasks.values())
+
+    @property
+    def pending(self) -> list[str]:
+        return [
+            name for name, task in self.__tasks.items() if not task.done()
+        ]
+
+    def add(self, name: str, fn: Callable[[], Any], *after: str) -> None:
+        # each task gets a thread that waits on the ones it depends on
+        future = concurrent.futures.Future()
+        self.__tasks[name] = future
+        dependencies = [self.__tasks[dependency] for dependency in after]
+        if self.threaded:
+            threading.Thread(
+                target=self.__run,
+                args=(name, fn, dependencies, future),
+                daemon=True,
+            ).start()
+        else:
+            self.__run(name, fn, dependencies, future)
+
+    def done(self, *names: str) -> bool:
+        return all(self.__tasks[name].done() for name in names)
+
+    def result(self, name: str) -> Any:
+        # blocks until the task has run, raising whatever it raised
+        return self.__tasks[name].result()
+
+    def wait(self, *names: str) -> None:
+        for name in names:
+            self.result(name)
+
+    def __run(
+        self,
+        name: str,
+        fn: Callable[[], Any],
+        dependencies: list[concurrent.futures.Future],
+        future: concurrent.futures.Future,
+    ):
+        try:
+            for dependency in dependencies:
+                dependency.result()
+            with self.profiler.stage('init.' + name):
+                future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
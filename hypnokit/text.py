@@ -0,0 +1,48 @@
+from collections import OrderedDict
+
+import pygame
+
+from typing import Callable, Hashable
+from .cache import surface_bytes
+
+
+class TextCache:
+    capacity: int = 64
+
+    __surfaces: OrderedDict[Hashable, pygame.Surface]
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+        self.__surfaces = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.__surfaces)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(map(surface_bytes, self.__surfaces.values()))
+
+    def clear(self):
+        self.__surfaces.clear()
+
+    def get(
+        self,
+        key: Hashable,
+        render: Callable[[], pygame.Surface],
+    ) -> pygame.Surface:
+        surface = self.__surfaces.get(key)
+        if surface is not None:
+            self.__surfaces.move_to_end(key)
+            return surface
+        surface = self.__surfaces[key] = render()
+        while len(self.__surfaces) > self.capacity:
+            self.__surfaces.popitem(last=False)
+        return surface
+
+    def evict(self, nbytes: int) -> int:
+        freed = 0
+        while self.__surfaces and freed < nbytes:
+            _, surface = self.__surfaces.popitem(last=False)
+            freed += surface_bytes(surface)
+        return freed
@@ -1,7 +1,120 @@
-import sys
+import argparse
 
 from hypnokit import Screen, Script
+from hypnokit.types import Size
 
 
-script = Script.load(sys.argv[1])
-Screen(script).run()
+def timestamp(value: str) -> int:
+    seconds = 0.0
+    for part in value.split(':'):
+        seconds = 60 * seconds + float(part)
+    return int(1000 * seconds)
+
+
+def size(value: str) -> Size:
+    width, height = value.lower().split('x')
+    return Size(int(width), int(height))
+
+
+def format_timestamp(millis: int) -> str:
+    minutes, seconds = divmod(millis // 1000, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}:{minutes:02}:{seconds:02}'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('script')
+    parser.add_argument(
+        '--profile',
+        metavar='PATH',
+        help='record per-stage frame timings and write them to PATH '
+             '(.json or .csv) on exit',
+    )
+    start = parser.add_mutually_exclusive_group()
+    start.add_argument(
+        '--start',
+        metavar='[[HH:]MM:]SS',
+        type=timestamp,
+        help='start the session at this point in the script',
+    )
+    start.add_argument(
+        '--start-action',
+        metavar='N',
+        type=int,
+        help='start the session at the Nth action of the script',
+    )
+    parser.add_argument(
+        '--duration',
+        action='store_true',
+        help='print the estimated length of the script and exit',
+    )
+    offline = parser.add_argument_group(
+        'export',
+        'render the script offline, faster than real time',
+    )
+    offline.add_argument(
+        '--export',
+        metavar='OUTPUT',
+        help='where frames go: a raw RGB file (- for stdout), an image '
+             'pattern like frames/%%06d.png, or a command to pipe them to',
+    )
+    offline.add_argument(
+        '--format',
+        choices=('raw', 'images', 'pipe'),
+        default='raw',
+    )
+    offline.add_argument(
+        '--size', metavar='WxH', type=size, default='1280x720',
+    )
+    offline.add_argument('--fps', type=int, default=30)
+    offline.add_argument(
+        '--end',
+        metavar='[[HH:]MM:]SS',
+        type=timestamp,
+        help='stop here instead of at the end of the script',
+    )
+    offline.add_argument(
+        '--audio',
+        metavar='PATH',
+        help='mix music, binaural and speech into a WAV file',
+    )
+    offline.add_argument(
+        '--jobs',
+        type=int,
+        help='processes rendering in parallel (default: one per CPU)',
+    )
+    args = parser.parse_args()
+    if args.export and args.start_action is not None:
+        parser.error('--start-action cannot be used with --export')
+
+    script = Script.load(args.script)
+    if args.duration:
+        duration = script.duration()
+        if duration is None:
+            print('unbounded')
+        else:
+            print(format_timestamp(duration))
+    elif args.export:
+        # imported here since it switches SDL to its headless drivers
+        from hypnokit.export import export
+        export(
+            args.script,
+            args.export,
+            format=args.format,
+            size=args.size,
+            frames_per_second=args.fps,
+            start=args.start or 0,
+            end=args.end,
+            audio=args.audio,
+            jobs=args.jobs,
+        )
+    else:
+        Screen(script, profile=args.profile).run(
+            start=args.start,
+            start_action=args.start_action,
+        )
+
+
+if __name__ == '__main__':
+    main()
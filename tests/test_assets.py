@@ -0,0 +1,98 @@
+from hypnokit.assets import AssetCache
+from hypnokit.types import Size
+
+
+class FakeAssets:
+    def __init__(self, size, ready=True):
+        self.size = size
+        self.nbytes = 100
+        self.ready = ready
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class Loader:
+    def __init__(self, ready=True):
+        self.loaded = []
+        self.ready = ready
+
+    def __call__(self, size):
+        self.loaded.append(size)
+        return FakeAssets(size, self.ready)
+
+
+def test_get_loads_once():
+    load = Loader()
+    cache = AssetCache(load)
+    assets = cache.get(Size(1, 1))
+    assert cache.get(Size(1, 1)) is assets
+    assert load.loaded == [Size(1, 1)]
+    assert Size(1, 1) in cache and len(cache) == 1
+
+
+def test_peek_neither_loads_nor_uses():
+    load = Loader()
+    cache = AssetCache(load)
+    assert cache.peek(Size(1, 1)) is None
+    assert load.loaded == []
+    cache.get(Size(1, 1))
+    cache.get(Size(2, 2))
+    cache.peek(Size(1, 1))
+    cache.evict(1)
+    assert Size(1, 1) not in cache
+
+
+def test_evicts_least_recently_used_first():
+    cache = AssetCache(Loader())
+    a = cache.get(Size(1, 1))
+    cache.get(Size(2, 2))
+    cache.get(Size(1, 1))
+    assert cache.evict(1) == 100
+    assert Size(2, 2) not in cache and not a.closed
+    assert cache.evictions == 1
+
+
+def test_evict_keeps_what_it_is_told():
+    cache = AssetCache(Loader())
+    a = cache.get(Size(1, 1))
+    cache.get(Size(2, 2))
+    assert cache.evict(10**6, Size(1, 1)) == 100
+    assert list(cache) == [a]
+
+
+def test_prefetched_sizes_go_first():
+    cache = AssetCache(Loader())
+    cache.get(Size(1, 1))
+    prefetched = cache.prefetch(Size(2, 2))
+    cache.evict(1)
+    assert prefetched.closed
+    assert Size(1, 1) in cache
+
+
+def test_nearest_stands_in_with_a_ready_size():
+    load = Loader()
+    cache = AssetCache(load)
+    near = cache.get(Size(100, 100))
+    cache.get(Size(500, 500))
+    load.ready = False
+    cache.prefetch(Size(110, 110))
+    assert cache.nearest(Size(110, 110)) == (Size(100, 100), near)
+
+
+def test_nearest_loads_when_nothing_is_ready():
+    load = Loader(ready=False)
+    cache = AssetCache(load)
+    size, assets = cache.nearest(Size(1, 1))
+    assert size == Size(1, 1) and assets.size == Size(1, 1)
+
+
+def test_replace_and_clear():
+    cache = AssetCache(Loader())
+    old = cache.get(Size(1, 1))
+    cache.replace(lambda size, assets: FakeAssets(size))
+    new = cache.get(Size(1, 1))
+    assert new is not old
+    cache.clear()
+    assert new.closed and len(cache) == 0
@@ -0,0 +1,69 @@
+import pygame
+import pytest
+
+from hypnokit.scheduler import AudioClock
+
+
+class Music:
+    position: int = -1
+
+    def get_pos(self) -> int:
+        return self.position
+
+
+@pytest.fixture
+def music(monkeypatch):
+    music = Music()
+    monkeypatch.setattr(pygame.mixer, 'get_init', lambda: (44100, -16, 2))
+    monkeypatch.setattr(pygame.mixer.music, 'get_pos', music.get_pos)
+    return music
+
+
+class Wall:
+    now: float = 1000
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_follows_the_wall_clock_without_music(music):
+    wall = Wall()
+    clock = AudioClock(fallback=wall)
+    wall.now += 250
+    assert clock() == 1250
+
+
+def test_follows_the_music_once_it_plays(music):
+    wall = Wall()
+    clock = AudioClock(fallback=wall)
+    music.position = 0
+    start = clock()
+    wall.now += 5000
+    music.position = 1000
+    # the music only got a second further, and that's what counts
+    assert clock() == start + 1000
+
+
+def test_interpolates_between_position_updates(music):
+    wall = Wall()
+    clock = AudioClock(fallback=wall, resolution=100)
+    music.position = 0
+    start = clock()
+    wall.now += 40
+    assert clock() == start + 40
+    wall.now += 500
+    assert clock() == start + 100
+
+
+def test_never_runs_backwards(music):
+    wall = Wall()
+    clock = AudioClock(fallback=wall)
+    music.position = 500
+    clock()
+    wall.now += 50
+    before = clock()
+    music.position = 0
+    assert clock() >= before
+    music.position = -1
+    wall.now += 10
+    assert clock() >= before
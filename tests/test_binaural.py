@@ -0,0 +1,36 @@
+import numpy
+import pytest
+
+from hypnokit.binaural import AMPLITUDE, binaural_samples, loop_seconds
+
+
+def test_loop_seconds_prefers_whole_cycles():
+    assert loop_seconds(100, 110) == 1
+    assert loop_seconds(100, 100.5) == 2
+    assert loop_seconds(100.25) == 4
+
+
+@pytest.mark.parametrize('channels', [1, 2])
+def test_length_matches_the_loop(channels):
+    data = binaural_samples(100, 10, 8000, -16, channels)
+    assert len(data) == 8000 * channels * 2
+
+
+def test_channels_carry_each_tone():
+    data = binaural_samples(100, 10, 8000, 32, 2)
+    samples = numpy.frombuffer(data, numpy.float32).reshape(-1, 2)
+    assert abs(samples).max() <= AMPLITUDE
+    spectrum = [abs(numpy.fft.rfft(samples[:, c])) for c in (0, 1)]
+    assert spectrum[0].argmax() == 100
+    assert spectrum[1].argmax() == 110
+
+
+def test_loops_without_a_click():
+    data = binaural_samples(100, 0.5, 8000, -16, 2)
+    samples = numpy.frombuffer(data, numpy.int16).reshape(-1, 2)
+    looped = numpy.concatenate([samples, samples]).astype(int)
+    steps = abs(numpy.diff(looped, axis=0))
+    # the seam is no bigger a step than any within the loop
+    seam = steps[len(samples) - 1]
+    inside = steps[:len(samples) - 1].max(axis=0)
+    assert (seam <= inside).all()
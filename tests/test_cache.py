@@ -0,0 +1,104 @@
+import os
+
+import pygame
+
+from hypnokit import cache
+from hypnokit.cache import limit_dir, prune_dir
+
+
+def write(path, size, mtime):
+    path.write_bytes(bytes(size))
+    os.utime(path, ns=(mtime, mtime))
+    return path
+
+
+def test_prune_drops_least_recently_used_first(tmp_path):
+    old = write(tmp_path / 'old.raw', 100, 1 * 10**18)
+    mid = write(tmp_path / 'mid.raw', 100, 2 * 10**18)
+    new = write(tmp_path / 'new.raw', 100, 3 * 10**18)
+    assert prune_dir(str(tmp_path), 250) == 100
+    assert not old.exists() and mid.exists() and new.exists()
+    assert prune_dir(str(tmp_path), 250) == 0
+
+
+def test_prune_only_counts_matching_files(tmp_path):
+    index = write(tmp_path / 'a.index', 1000, 1 * 10**18)
+    raw = write(tmp_path / 'b.raw', 100, 2 * 10**18)
+    assert prune_dir(str(tmp_path), 100, '.raw') == 0
+    assert index.exists() and raw.exists()
+
+
+def test_limit_only_rescans_after_enough_is_written(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, '_written', {})
+    scans = []
+    monkeypatch.setattr(
+        cache, 'prune_dir', lambda *args: scans.append(args) or 0
+    )
+    # a tenth of the limit between scans, after the first
+    limit_dir(str(write(tmp_path / 'a.raw', 60, 10**18)), 1000)
+    assert len(scans) == 1
+    limit_dir(str(write(tmp_path / 'b.raw', 60, 10**18)), 1000)
+    assert len(scans) == 1
+    limit_dir(str(write(tmp_path / 'c.raw', 60, 10**18)), 1000)
+    assert len(scans) == 2
+
+
+def test_loading_counts_as_a_use(tmp_path):
+    path = str(tmp_path / 'a.raw')
+    cache.save_surfaces(path, [pygame.Surface((2, 2), 0, 32)])
+    os.utime(path, ns=(10**9, 10**9))
+    assert cache.load_surfaces(path)
+    assert os.stat(path).st_mtime_ns > 10**9
+
+
+def pattern(size, depth):
+    surface = pygame.Surface(size, 0, depth)
+    for x in range(size[0]):
+        for y in range(size[1]):
+            surface.set_at((x, y), (x * 40, y * 40, 7) if depth > 8 else x)
+    return surface
+
+
+def test_surfaces_round_trip(tmp_path):
+    path = str(tmp_path / 'a.raw')
+    surfaces = [pattern((3, 2), 32), pattern((1, 4), 32)]
+    cache.save_surfaces(path, surfaces)
+    loaded = cache.load_surfaces(path)
+    assert [s.get_size() for s in loaded] == [(3, 2), (1, 4)]
+    for old, new in zip(surfaces, loaded):
+        assert (
+            pygame.image.tobytes(new, 'RGB')
+            == pygame.image.tobytes(old, 'RGB')
+        )
+
+
+def test_palette_surfaces_round_trip(tmp_path):
+    path = str(tmp_path / 'a.raw')
+    surfaces = [pattern((5, 3), 8), pattern((2, 2), 8)]
+    cache.save_surfaces(path, surfaces, 'P')
+    loaded = cache.load_surfaces(path, 'P')
+    assert [s.get_bitsize() for s in loaded] == [8, 8]
+    for old, new in zip(surfaces, loaded):
+        assert pygame.image.tobytes(new, 'P') == pygame.image.tobytes(old, 'P')
+
+
+def test_truncated_surfaces_are_a_miss(tmp_path):
+    path = tmp_path / 'a.raw'
+    cache.save_surfaces(str(path), [pattern((3, 2), 32)])
+    path.write_bytes(path.read_bytes()[:-1])
+    assert cache.load_surfaces(str(path)) is None
+    assert cache.load_surfaces(str(tmp_path / 'missing.raw')) is None
+
+
+def test_marshal_round_trip(tmp_path):
+    path = str(tmp_path / 'a.marshal')
+    cache.save_marshal(path, {'names': ['a.png'], 'mtime': 10**18})
+    assert cache.load_marshal(path) == {'names': ['a.png'], 'mtime': 10**18}
+
+
+def test_unmarshallable_values_are_not_saved(tmp_path):
+    path = tmp_path / 'a.marshal'
+    cache.save_marshal(str(path), object())
+    assert not path.exists()
+    path.write_bytes(b'\xff')
+    assert cache.load_marshal(str(path)) is None
@@ -0,0 +1,120 @@
+import pygame
+import pytest
+
+from hypnokit.compositor import Compositor, Layer, bounds
+
+SIZE = (40, 30)
+
+
+@pytest.fixture
+def updates(monkeypatch):
+    updates = []
+    monkeypatch.setattr(pygame.display, 'flip', lambda: updates.append(None))
+    monkeypatch.setattr(pygame.display, 'update', updates.append)
+    return updates
+
+
+def filled(size, color):
+    surface = pygame.Surface(size)
+    surface.fill(color)
+    return surface
+
+
+def palette(color):
+    surface = pygame.Surface((6, 6), depth=8)
+    surface.fill(1)
+    surface.set_palette_at(1, pygame.Color(color))
+    return surface
+
+
+def redraw(layers):
+    # what a compositor starting from scratch draws
+    surface = pygame.Surface(SIZE)
+    Compositor(surface).draw(layers)
+    return pygame.image.tobytes(surface, 'RGB')
+
+
+def test_first_draw_flips_everything(updates):
+    compositor = Compositor(pygame.Surface(SIZE))
+    compositor.draw([Layer('text', filled((4, 4), 'red'))])
+    assert updates == [None]
+    assert compositor.flips == 1
+
+
+def test_unchanged_layers_are_skipped(updates):
+    compositor = Compositor(pygame.Surface(SIZE))
+    layers = [Layer('text', filled((4, 4), 'red'))]
+    compositor.draw(layers)
+    compositor.draw(list(layers))
+    assert len(updates) == 1
+    assert compositor.skips == 1
+
+
+def test_partial_update_matches_a_full_redraw(updates):
+    surface = pygame.Surface(SIZE)
+    compositor = Compositor(surface)
+    image = Layer('image', filled(SIZE, 'blue'), static=True)
+    compositor.draw([image, Layer('text', filled((10, 8), 'red'))])
+    layers = [image, Layer('text', filled((4, 4), 'green'))]
+    compositor.draw(layers)
+    # only where the old and new text were
+    assert updates[-1] == pygame.Rect(15, 11, 10, 8)
+    assert compositor.updates == 1
+    assert pygame.image.tobytes(surface, 'RGB') == redraw(layers)
+
+
+def test_large_changes_flip_the_whole_screen(updates):
+    compositor = Compositor(pygame.Surface(SIZE))
+    compositor.draw([Layer('text', filled((4, 4), 'red'))])
+    compositor.draw([Layer('text', filled((36, 26), 'red'))])
+    assert updates == [None, None]
+
+
+def test_static_layers_are_composited_once(updates):
+    surface = pygame.Surface(SIZE)
+    compositor = Compositor(surface)
+    image = Layer('image', filled(SIZE, 'blue'), static=True)
+    for size in ((4, 4), (6, 6), (4, 4)):
+        compositor.draw([image, Layer('text', filled(size, 'red'))])
+    assert compositor.composites == 1
+
+
+def test_a_static_change_rebuilds_the_composite(updates):
+    surface = pygame.Surface(SIZE)
+    compositor = Compositor(surface)
+    compositor.draw([Layer('image', filled(SIZE, 'blue'), static=True)])
+    layers = [Layer('image', filled(SIZE, 'yellow'), static=True)]
+    compositor.draw(layers)
+    assert compositor.composites == 2
+    assert pygame.image.tobytes(surface, 'RGB') == redraw(layers)
+
+
+def test_palette_changes_need_a_new_version(updates):
+    surface = pygame.Surface(SIZE)
+    compositor = Compositor(surface)
+    spiral = palette('red')
+    compositor.draw([Layer('spiral', spiral, version=1)])
+    # the surface is the same object, so only the version tells them apart
+    spiral.set_palette_at(1, pygame.Color('green'))
+    compositor.draw([Layer('spiral', spiral, version=1)])
+    assert compositor.skips == 1
+    layers = [Layer('spiral', spiral, version=2)]
+    compositor.draw(layers)
+    assert compositor.updates == 1
+    assert pygame.image.tobytes(surface, 'RGB') == redraw(layers)
+
+
+def test_invalidate_redraws_everything(updates):
+    compositor = Compositor(pygame.Surface(SIZE))
+    layers = [Layer('text', filled((4, 4), 'red'))]
+    compositor.draw(layers)
+    compositor.invalidate()
+    compositor.draw(layers)
+    assert updates == [None, None]
+
+
+def test_bounds_cover_scaling_and_rotation():
+    layer = Layer('spiral', pygame.Surface((10, 10)), scale=2)
+    assert bounds(SIZE, layer) == pygame.Rect(10, 5, 20, 20)
+    layer = layer._replace(scale=1, angle=45)
+    assert bounds(SIZE, layer).size == (15, 15)
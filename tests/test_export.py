@@ -0,0 +1,49 @@
+import pytest
+
+from hypnokit.export import join_voices
+from hypnokit.recorder import Voice
+
+
+BINAURAL = ('binaural', 10, 8)
+
+
+def test_loops_continue_across_segments():
+    voices = join_voices([
+        Voice(60000.0, BINAURAL, loop=True, end=90000.0),
+        Voice(0.0, BINAURAL, loop=True, end=60000.0),
+    ])
+    assert [voice.offset for voice in voices] == [0.0, 60.0]
+
+
+def test_offsets_accumulate():
+    voices = join_voices([
+        Voice(0.0, BINAURAL, offset=1.5, loop=True, end=1000.0),
+        Voice(1000.0, BINAURAL, loop=True, end=2000.0),
+        Voice(2000.0, BINAURAL, loop=True, end=3000.0),
+    ])
+    assert [voice.offset for voice in voices] == [1.5, 2.5, 3.5]
+
+
+def test_restarted_loops_start_over():
+    voices = join_voices([
+        Voice(0.0, BINAURAL, loop=True, end=1000.0),
+        Voice(1500.0, BINAURAL, loop=True, end=2000.0),
+    ])
+    assert voices[1].offset == 0.0
+
+
+def test_one_shots_are_left_alone():
+    speech = ('file', 'speech.wav')
+    voices = join_voices([
+        Voice(0.0, speech, end=1000.0),
+        Voice(1000.0, speech),
+    ])
+    assert voices[1].offset == 0.0
+
+
+def test_other_sources_do_not_join():
+    voices = join_voices([
+        Voice(0.0, BINAURAL, loop=True, end=1000.0),
+        Voice(1000.0, ('file', 'music.ogg'), loop=True),
+    ])
+    assert voices[1].offset == pytest.approx(0.0)
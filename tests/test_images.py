@@ -0,0 +1,35 @@
+import pygame
+
+from hypnokit.images import Images
+from hypnokit.types import Size
+
+
+def test_empty_folder_gives_no_image(tmp_path):
+    images = Images(Size(10, 10), str(tmp_path), cache=False)
+    assert images.wait(5) is False
+    assert next(images) is None
+    images.close()
+
+
+def test_missing_folder_gives_no_image(tmp_path):
+    images = Images(Size(10, 10), str(tmp_path / 'missing'), cache=False)
+    assert next(images) is None
+    images.close()
+
+
+def test_unreadable_images_give_no_image(tmp_path):
+    (tmp_path / 'broken.png').write_bytes(b'not a png')
+    images = Images(Size(10, 10), str(tmp_path), cache=False, blocking=True)
+    assert next(images) is None
+    images.close()
+
+
+def test_images_are_scaled_to_cover(tmp_path):
+    pygame.image.save(pygame.Surface((4, 2)), str(tmp_path / 'a.png'))
+    images = Images(Size(10, 10), str(tmp_path), cache=False, alpha=100)
+    assert images.wait(5) is True
+    image = next(images)
+    assert image.get_width() >= 11 and image.get_height() >= 11
+    assert image.get_alpha() == 100
+    assert images.hits == 1
+    images.close()
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from hypnokit.index import ImageIndex
+
+
+def touch(path, mtime=None):
+    path.write_bytes(b'')
+    if mtime is not None:
+        os.utime(path.parent, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('HYPNOKIT_CACHE', str(tmp_path / 'cache'))
+
+
+def test_only_lists_image_files(tmp_path):
+    for name in ('a.png', 'b.JPG', 'notes.txt', 'c'):
+        touch(tmp_path / name)
+    (tmp_path / 'folder.png').mkdir()
+    index = ImageIndex(str(tmp_path), cache=False)
+    assert sorted(index.names) == ['a.png', 'b.JPG']
+
+
+def test_record(tmp_path):
+    touch(tmp_path / 'a.png')
+    touch(tmp_path / 'b.png')
+    index = ImageIndex(str(tmp_path), cache=False)
+    index.record('a.png', (3, 4))
+    index.record('b.png', None)
+    index.record('gone.png', (1, 1))
+    assert index.dimensions('a.png') == (3, 4)
+    assert index.dimensions('gone.png') is None
+    assert index.names == ['a.png'] and len(index) == 1
+
+
+def test_refresh_rescans_when_the_folder_changes(tmp_path):
+    touch(tmp_path / 'a.png', 10**18)
+    index = ImageIndex(str(tmp_path), cache=False, rescan=0)
+    index.record('a.png', (3, 4))
+    assert not index.refresh()
+    touch(tmp_path / 'b.png', 2 * 10**18)
+    assert index.refresh()
+    assert sorted(index.names) == ['a.png', 'b.png']
+    assert index.dimensions('a.png') == (3, 4)
+    assert index.scans == 2
+
+
+def test_refresh_waits_between_checks(tmp_path):
+    touch(tmp_path / 'a.png', 10**18)
+    index = ImageIndex(str(tmp_path), cache=False, rescan=3600)
+    touch(tmp_path / 'b.png', 2 * 10**18)
+    assert not index.refresh()
+    assert index.names == ['a.png']
+
+
+def test_missing_folder_is_empty(tmp_path, capsys):
+    index = ImageIndex(str(tmp_path / 'missing'), cache=False, rescan=0)
+    index.refresh()
+    assert index.names == [] and len(index) == 0
+    assert capsys.readouterr().err.count('cannot read image folder') == 1
+
+
+def test_saved_index_is_reused(tmp_path, cache):
+    touch(tmp_path / 'a.png', 10**18)
+    index = ImageIndex(str(tmp_path))
+    index.record('a.png', (3, 4))
+    index.save()
+    again = ImageIndex(str(tmp_path))
+    assert again.scans == 0
+    assert again.dimensions('a.png') == (3, 4)
+    touch(tmp_path / 'b.png', 2 * 10**18)
+    assert ImageIndex(str(tmp_path)).scans == 1
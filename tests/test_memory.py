@@ -0,0 +1,66 @@
+import io
+
+from hypnokit.memory import MEGABYTE, MemoryBudget
+
+
+class Holder:
+    def __init__(self, nbytes):
+        self.nbytes = nbytes
+        self.asked = []
+
+    def evict(self, nbytes):
+        self.asked.append(nbytes)
+        freed = min(nbytes, self.nbytes)
+        self.nbytes -= freed
+        return freed
+
+
+def test_usage_and_total():
+    memory = MemoryBudget()
+    memory.add('a', lambda: 1)
+    memory.add('b', lambda: 2)
+    assert memory.usage() == {'a': 1, 'b': 2}
+    assert memory.total == 3
+
+
+def test_nothing_is_evicted_under_budget():
+    memory = MemoryBudget(budget=100)
+    holder = Holder(50)
+    memory.add('holder', lambda: holder.nbytes)
+    memory.add_evictor(holder.evict)
+    assert memory.enforce() == 0
+    assert holder.asked == []
+
+
+def test_evictors_are_asked_in_order():
+    memory = MemoryBudget(budget=100)
+    first, second = Holder(30), Holder(100)
+    memory.add('first', lambda: first.nbytes)
+    memory.add('second', lambda: second.nbytes)
+    memory.add_evictor(first.evict)
+    memory.add_evictor(second.evict)
+    assert memory.enforce() == 30
+    assert first.asked == [30] and second.asked == []
+    first.nbytes = 10
+    second.nbytes = 150
+    assert memory.enforce() == 60
+    assert first.asked == [30, 60] and second.asked == [50]
+    assert memory.freed == 90 and memory.total == 100
+
+
+def test_report():
+    memory = MemoryBudget(budget=4 * MEGABYTE)
+    memory.add('spiral', lambda: MEGABYTE)
+    memory.add('text', lambda: MEGABYTE // 2)
+    assert memory.report() == (
+        'memory: 1.5 of 4.0 MB (spiral 1.0, text 0.5)'
+    )
+
+
+def test_update_logs_only_when_asked():
+    file = io.StringIO()
+    MemoryBudget(file=file).update()
+    assert file.getvalue() == ''
+    memory = MemoryBudget(file=file, log=1e-9)
+    memory.update()
+    assert file.getvalue().startswith('memory: ')
@@ -0,0 +1,36 @@
+import time
+
+import pytest
+
+from hypnokit.pool import PriorityPool
+
+
+@pytest.fixture
+def pool():
+    pool = PriorityPool(workers=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_runs_tasks(pool):
+    assert pool.submit(0, pow, 2, 10).result(timeout=30) == 1024
+
+
+def test_task_errors_are_passed_on(pool):
+    with pytest.raises(ZeroDivisionError):
+        pool.submit(0, divmod, 1, 0).result(timeout=30)
+
+
+def test_shutdown_cancels_queued_tasks(pool):
+    pool.submit(0, pow, 2, 10).result(timeout=30)
+    running = pool.submit(0, time.sleep, 0.5)
+    time.sleep(0.1)
+    queued = [pool.submit(1, pow, 2, n) for n in range(3)]
+    pool.shutdown()
+    assert running.result() is None
+    assert all(future.cancelled() for future in queued)
+
+
+def test_submit_after_shutdown_is_cancelled(pool):
+    pool.shutdown()
+    assert pool.submit(0, pow, 2, 10).cancelled()
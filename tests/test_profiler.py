@@ -0,0 +1,43 @@
+import csv
+import json
+
+from hypnokit.profiler import Profiler
+
+
+def profile(path):
+    profiler = Profiler(path=str(path), frames_per_second=50)
+    for _ in range(3):
+        with profiler.stage('render'):
+            pass
+        profiler.frame(20)
+    profiler.late = 1
+    profiler.dropped = 2
+    profiler.write(memory={'images': 10, 'budget': None})
+    return profiler
+
+
+def test_json_summary(tmp_path):
+    profile(tmp_path / 'profile.json')
+    summary = json.loads((tmp_path / 'profile.json').read_text())
+    assert summary['frames'] == 3
+    assert summary['stages']['render']['count'] == 3
+    assert summary['memory'] == {'images': 10, 'budget': None}
+
+
+def test_csv_has_stages_then_the_summary(tmp_path):
+    profile(tmp_path / 'profile.csv')
+    with open(tmp_path / 'profile.csv', newline='') as f:
+        rows = list(csv.reader(f))
+    blank = rows.index([])
+    stages = rows[:blank]
+    assert stages[0][:3] == ['stage', 'count', 'mean']
+    assert {row[0] for row in stages[1:]} == {'render', 'frame'}
+    assert rows[blank + 1] == ['name', 'value']
+    assert rows[blank + 2:] == [
+        ['frames', '3'],
+        ['frames_per_second', '50'],
+        ['late', '1'],
+        ['dropped', '2'],
+        ['memory.images', '10'],
+        ['memory.budget', ''],
+    ]
@@ -0,0 +1,115 @@
+import math
+
+import pytest
+
+from hypnokit.scheduler import Scheduler
+
+
+class Clock:
+    now: float = 0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_fires_after_each_period(clock):
+    ticker = Scheduler(clock=clock, action=500)
+    ticker.update()
+    assert not ticker.pop('action')
+    clock.now = 500
+    ticker.update()
+    assert ticker.pop('action')
+    assert not ticker.pop('action')
+
+
+def test_stays_on_the_original_grid(clock):
+    ticker = Scheduler(clock=clock, action=100)
+    clock.now = 350
+    ticker.update()
+    assert ticker.pop('action')
+    assert ticker.next_deadline() == 400
+
+
+def test_one_shot_fires_once(clock):
+    ticker = Scheduler(clock=clock)
+    ticker.add('resize', 250, repeat=False)
+    clock.now = 1000
+    ticker.update()
+    assert ticker.pop('resize')
+    clock.now = 2000
+    ticker.update()
+    assert not ticker.pop('resize')
+    assert ticker.period('resize') is None
+
+
+def test_re_adding_moves_the_deadline(clock):
+    ticker = Scheduler(clock=clock)
+    ticker.add('resize', 250, repeat=False)
+    clock.now = 200
+    ticker.add('resize', 250, repeat=False)
+    clock.now = 300
+    ticker.update()
+    assert not ticker.pop('resize')
+    clock.now = 450
+    ticker.update()
+    assert ticker.pop('resize')
+
+
+def test_delay(clock):
+    ticker = Scheduler(clock=clock, action=500)
+    ticker.delay('action', 200)
+    clock.now = 500
+    ticker.update()
+    assert not ticker.pop('action')
+    clock.now = 700
+    ticker.update()
+    assert ticker.pop('action')
+
+
+def test_restart_counts_from_now(clock):
+    ticker = Scheduler(clock=clock, action=500)
+    clock.now = 300
+    ticker.restart('action')
+    assert ticker.next_deadline() == 800
+
+
+def test_trigger_is_ready_without_waiting(clock):
+    ticker = Scheduler(clock=clock, image=1000)
+    ticker.trigger('image')
+    assert ticker.pop('image')
+
+
+def test_next_deadline_ignores_keys_that_do_not_wake(clock):
+    ticker = Scheduler(clock=clock)
+    ticker.add('spiral', 1, wake=False)
+    assert ticker.next_deadline() == math.inf
+    ticker.add('action', 500)
+    assert ticker.next_deadline() == 500
+
+
+def test_remove(clock):
+    ticker = Scheduler(clock=clock, action=500)
+    ticker.remove('action')
+    clock.now = 1000
+    ticker.update()
+    assert not ticker.pop('action')
+    assert ticker.next_deadline() == math.inf
+
+
+def test_reset_starts_every_period_again(clock):
+    ticker = Scheduler(clock=clock, action=500)
+    clock.now = 600
+    ticker.update()
+    ticker.reset()
+    assert not ticker.pop('action')
+    assert ticker.next_deadline() == 1100
+
+
+def test_period_must_be_positive(clock):
+    with pytest.raises(ValueError):
+        Scheduler(clock=clock, action=0)
@@ -0,0 +1,168 @@
+import pytest
+
+from hypnokit.script import (
+    HALT, JUMP, Script, ScriptError, WordAction,
+)
+
+
+def load(actions, subroutines=None):
+    return Script('script.yaml', {
+        'actions': actions,
+        'subroutines': subroutines or {},
+    })
+
+
+def words(script, limit=20):
+    return [
+        action.word for action, _ in zip(script, range(limit))
+        if isinstance(action, WordAction)
+    ]
+
+
+def test_words_compile_to_emits():
+    assert words(load([{'words': 'a b'}])) == ['a', 'b', '']
+
+
+def test_repeat_times():
+    script = load([{'repeat': {'times': 2, 'actions': [{'word': 'a'}]}}])
+    assert words(script) == ['a', '', 'a', '']
+    assert script.program.is_finite()
+
+
+def test_repeat_zero_times_emits_nothing():
+    script = load([{'repeat': {'times': 0, 'actions': [{'word': 'a'}]}}])
+    assert words(script) == []
+
+
+def test_repeat_forever():
+    script = load([{'repeat': {'actions': [{'word': 'a'}]}}])
+    assert words(script, 6) == ['a', '', 'a', '', 'a', '']
+    assert not script.program.is_finite()
+
+
+def test_empty_repeat_forever_ends():
+    script = load([{'repeat': {'actions': []}}, {'word': 'a'}])
+    assert words(script) == ['a', '']
+    assert script.program.is_finite()
+
+
+def test_repeat_forever_of_empty_calls_ends():
+    script = load(
+        [{'repeat': {'actions': [{'call': 'nothing'}]}}, {'word': 'a'}],
+        {'nothing': []},
+    )
+    assert words(script) == ['a', '']
+
+
+def test_nested_empty_repeats_end():
+    script = load([
+        {'repeat': {'actions': [{'repeat': {'actions': []}}]}},
+        {'word': 'a'},
+    ])
+    assert words(script) == ['a', '']
+
+
+def test_call_returns_to_caller():
+    script = load(
+        [{'call': 'sub'}, {'word': 'b'}],
+        {'sub': [{'word': 'a'}]},
+    )
+    assert words(script) == ['a', '', 'b', '']
+
+
+def test_program_ends_with_halt():
+    program = load([{'word': 'a'}]).program
+    assert program.code[2].op == HALT
+    assert JUMP not in (op for op, _ in program.code)
+
+
+def test_unknown_action():
+    with pytest.raises(ScriptError, match=r'actions\[0\]: unknown action'):
+        load([{'dance': True}])
+
+
+def test_unknown_subroutine():
+    with pytest.raises(ScriptError, match='unknown subroutine'):
+        load([{'call': 'missing'}])
+
+
+def test_wrong_argument_type():
+    with pytest.raises(ScriptError, match='expected bool'):
+        load([{'spiral': 'yes'}])
+
+
+def test_recursive_subroutine_is_rejected():
+    with pytest.raises(ScriptError, match='subroutines.a: calls itself'):
+        load([{'call': 'a'}], {'a': [{'word': 'x'}, {'call': 'a'}]})
+
+
+def test_mutual_recursion_is_rejected():
+    with pytest.raises(ScriptError, match='calls itself'):
+        load([{'call': 'a'}], {'a': [{'call': 'b'}], 'b': [{'call': 'a'}]})
+
+
+def test_recursion_through_a_group_is_rejected():
+    with pytest.raises(ScriptError, match='calls itself'):
+        load([{'call': 'a'}], {'a': [{'group': [{'call': 'a'}]}]})
+
+
+def test_shared_subroutine_is_not_recursion():
+    script = load(
+        [{'call': 'a'}, {'call': 'b'}],
+        {'a': [{'call': 'c'}], 'b': [{'call': 'c'}], 'c': [{'word': 'x'}]},
+    )
+    assert words(script) == ['x', '', 'x', '']
+
+
+def test_duration_of_a_finite_script():
+    script = load([{'words': 'a b'}, {'rest': 1000}])
+    # each action takes the default 500ms, plus the rest
+    assert script.duration() == 500 + 3 * 500 + 1500
+
+
+def test_duration_of_an_endless_script():
+    assert load([{'repeat': {'actions': [{'word': 'a'}]}}]).duration() is None
+
+
+def test_seek_by_index():
+    actions, state = load([{'spiral': True}, {'words': 'a b'}]).seek(index=2)
+    assert state.enable_spiral
+    assert state.text == 'a'
+    assert next(actions).word == 'b'
+
+
+def test_seek_counts_time_with_the_spiral_on():
+    script = load([
+        {'spiral': True}, {'rest': 300}, {'spiral': False}, {'rest': 200},
+        {'spiral': True}, {'rest': 1000},
+    ])
+    _, state = script.seek(index=6)
+    # each action takes the default 500ms, plus any rest
+    assert state.spiral_millis == 500 + 800 + 500 + 1500
+
+
+def write_script(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+def test_load_reuses_the_cache(tmp_path):
+    path = write_script(tmp_path / 'a.yaml', 'actions: [{word: a}]\n')
+    assert words(Script.load(path)) == ['a', '']
+    assert (tmp_path / '.a.yaml.cache').exists()
+    assert words(Script.load(path)) == ['a', '']
+
+
+def test_load_ignores_a_cache_from_another_version(tmp_path, monkeypatch):
+    import hypnokit.script
+    path = write_script(tmp_path / 'a.yaml', 'actions: [{word: a}]\n')
+    Script.load(path)
+    # same source, so only the version can tell the payloads apart
+    cache = tmp_path / '.a.yaml.cache'
+    data = hypnokit.script.load_marshal(str(cache))
+    hypnokit.script.save_marshal(
+        str(cache), (data[0], 0, 0, data[3], {'actions': [{'word': 'b'}]})
+    )
+    assert words(Script.load(path)) == ['b', '']
+    monkeypatch.setattr(hypnokit.script, 'CACHE_VERSION', data[0] + 1)
+    assert words(Script.load(path)) == ['a', '']
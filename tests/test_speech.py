@@ -0,0 +1,83 @@
+import queue
+
+import pygame
+import pytest
+
+import hypnokit.speech
+from hypnokit.speech import SPEECH_END, Speech
+
+
+class Channel:
+    played = []
+
+    def __init__(self, id):
+        pass
+
+    def set_endevent(self, type):
+        pass
+
+    def play(self, sound):
+        self.played.append(sound)
+
+
+@pytest.fixture
+def events(monkeypatch):
+    events = queue.Queue()
+    monkeypatch.setattr(Channel, 'played', [])
+    monkeypatch.setattr(pygame.mixer, 'Channel', Channel)
+    monkeypatch.setattr(pygame.mixer, 'set_reserved', lambda count: count)
+    monkeypatch.setattr(pygame.mixer, 'Sound', lambda path: path)
+    monkeypatch.setattr(pygame.event, 'post', events.put)
+    monkeypatch.setattr(hypnokit.speech, 'init_engine', lambda *args: object())
+    return events
+
+
+@pytest.fixture
+def speech(events, monkeypatch):
+    def synthesize(engine, text, *args):
+        if text == 'broken':
+            raise OSError('no voice')
+        return f'{text}.wav'
+
+    monkeypatch.setattr(hypnokit.speech, 'synthesize', synthesize)
+    speech = Speech()
+    yield speech
+    speech.close()
+
+
+def synthesized(speech, events, count):
+    for _ in range(count):
+        speech.handle(events.get(timeout=10))
+
+
+def end(speech):
+    speech.handle(pygame.event.Event(SPEECH_END))
+
+
+def test_utterances_play_one_after_another(speech, events):
+    speech.say('a')
+    speech.say('b')
+    synthesized(speech, events, 2)
+    assert Channel.played == ['a.wav']
+    assert speech.busy
+    end(speech)
+    assert Channel.played == ['a.wav', 'b.wav']
+    assert speech.busy
+    end(speech)
+    assert not speech.busy
+
+
+def test_prepared_speech_plays_straight_away(speech, events):
+    speech.prepare('a')
+    synthesized(speech, events, 1)
+    speech.say('a')
+    assert Channel.played == ['a.wav']
+
+
+def test_failed_speech_is_skipped(speech, events):
+    speech.say('broken')
+    speech.say('b')
+    synthesized(speech, events, 2)
+    assert Channel.played == ['b.wav']
+    end(speech)
+    assert not speech.busy
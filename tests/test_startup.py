@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+
+from hypnokit.startup import Startup
+
+
+@pytest.mark.parametrize('threaded', [True, False])
+def test_results(threaded):
+    startup = Startup(threaded=threaded)
+    startup.add('a', lambda: 1)
+    startup.add('b', lambda: startup.result('a') + 1, 'a')
+    assert startup.result('b') == 2
+    assert startup.done('a', 'b')
+    assert len(startup) == startup.finished == 2
+    assert startup.pending == []
+
+
+def test_waits_on_dependencies():
+    startup = Startup()
+    gate = threading.Event()
+    order = []
+    startup.add('slow', lambda: (gate.wait(5), order.append('slow')))
+    startup.add('after', lambda: order.append('after'), 'slow')
+    assert startup.pending == ['slow', 'after']
+    gate.set()
+    startup.wait('after')
+    assert order == ['slow', 'after']
+
+
+def test_failures_reach_dependents():
+    def fail():
+        raise ValueError('broken')
+    startup = Startup()
+    startup.add('broken', fail)
+    startup.add('after', lambda: 1, 'broken')
+    with pytest.raises(ValueError):
+        startup.result('broken')
+    with pytest.raises(ValueError):
+        startup.wait('after')
+
+
+def test_not_threaded_runs_at_once():
+    startup = Startup(threaded=False)
+    ran = []
+    startup.add('a', lambda: ran.append(threading.current_thread()))
+    assert ran == [threading.current_thread()]
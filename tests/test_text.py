@@ -0,0 +1,42 @@
+import pygame
+
+from hypnokit.text import TextCache
+
+
+def render(width=10):
+    return lambda: pygame.Surface((width, 10), 0, 32)
+
+
+def test_renders_once_per_key():
+    cache = TextCache()
+    calls = []
+
+    def counted():
+        calls.append(1)
+        return pygame.Surface((1, 1))
+    first = cache.get('a', counted)
+    assert cache.get('a', counted) is first
+    assert len(calls) == 1
+
+
+def test_drops_the_least_recently_used_over_capacity():
+    cache = TextCache(capacity=2)
+    a = cache.get('a', render())
+    cache.get('b', render())
+    cache.get('a', render())
+    cache.get('c', render())
+    assert len(cache) == 2
+    assert cache.get('a', render()) is a
+    b = cache.get('b', render())
+    assert cache.get('b', render()) is b
+
+
+def test_nbytes_and_evict():
+    cache = TextCache()
+    cache.get('a', render(10))
+    cache.get('b', render(20))
+    assert cache.nbytes == 10 * 10 * 4 + 20 * 10 * 4
+    assert cache.evict(1) == 10 * 10 * 4
+    assert len(cache) == 1
+    assert cache.evict(10**6) == 20 * 10 * 4
+    assert len(cache) == 0